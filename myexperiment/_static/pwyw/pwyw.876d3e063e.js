@@ -0,0 +1,231 @@
+/* Shared behaviour of the PWYW pages. Built into _static/pwyw by python my_game/assets.py */
+(function () {
+  "use strict";
+
+  // Show an element only while a radio field has a given value:
+  // <div data-show-if="buyer_decision=True">. With data-required-message, its
+  // inputs are required while shown and left out of the form while hidden, so
+  // the browser checks them (including min/max) before anything is sent.
+  function initShowIf() {
+    document.querySelectorAll("[data-show-if]").forEach(function (el) {
+      const [name, value] = el.dataset.showIf.split("=");
+      const radios = document.querySelectorAll('input[name="' + name + '"]');
+      const message = el.dataset.requiredMessage;
+      const inputs = message ? el.querySelectorAll("input") : [];
+
+      function toggle() {
+        const checked = document.querySelector('input[name="' + name + '"]:checked');
+        const shown = Boolean(checked && checked.value === value);
+        el.style.display = shown ? "block" : "none";
+        inputs.forEach(function (input) {
+          input.required = shown;
+          input.disabled = !shown;
+        });
+      }
+
+      inputs.forEach(function (input) {
+        input.addEventListener("invalid", function () {
+          input.setCustomValidity(input.validity.valueMissing ? message : "");
+        });
+        input.addEventListener("input", function () {
+          input.setCustomValidity("");
+        });
+      });
+
+      toggle();
+      radios.forEach(function (radio) {
+        radio.addEventListener("change", toggle);
+      });
+    });
+  }
+
+  // Animate numbers up to their final value: <span class="count-up" data-value="42">
+  function initCountUp() {
+    const duration = 2000; // 2 seconds
+    document.querySelectorAll(".count-up").forEach(function (el) {
+      const target = parseInt(el.dataset.value);
+      if (isNaN(target)) {
+        el.textContent = el.dataset.value;
+        return;
+      }
+      const startTime = performance.now();
+
+      function update(currentTime) {
+        const progress = Math.min((currentTime - startTime) / duration, 1);
+        // Ease out cubic
+        const ease = 1 - Math.pow(1 - progress, 3);
+        el.textContent = progress < 1 ? Math.floor(ease * target) : target;
+        if (progress < 1) requestAnimationFrame(update);
+      }
+
+      requestAnimationFrame(update);
+    });
+  }
+
+  // Store the checked boxes of a group as a JSON list in a hidden input:
+  // <div data-json-list="dem_employment"> ...checkboxes... <input type="hidden" name="dem_employment">
+  function initJsonList() {
+    document.querySelectorAll("[data-json-list]").forEach(function (el) {
+      const input = el.querySelector('input[name="' + el.dataset.jsonList + '"]');
+      const boxes = el.querySelectorAll('input[type="checkbox"]');
+      boxes.forEach(function (box) {
+        box.addEventListener("change", function () {
+          const selected = [];
+          boxes.forEach(function (cb) {
+            if (cb.checked) selected.push(cb.value);
+          });
+          input.value = JSON.stringify(selected);
+        });
+      });
+    });
+  }
+
+  // Comprehension check: count the wrong answers in the browser by comparing
+  // salted SHA-256 digests with js_vars.answer_digests (see answer_digest in
+  // intro/__init__.py). Only a fully correct form is posted; the server
+  // checks it again. crypto.subtle only exists on https:// and localhost, so
+  // elsewhere every attempt goes to the server as before.
+  async function answerDigest(name, value) {
+    const text = js_vars.answer_salt + ":" + name + ":" + value;
+    const hash = await crypto.subtle.digest("SHA-256", new TextEncoder().encode(text));
+    return Array.from(new Uint8Array(hash), function (b) {
+      return b.toString(16).padStart(2, "0");
+    })
+      .join("")
+      .slice(0, 16);
+  }
+
+  function initAnswerCheck() {
+    const form = document.getElementById("form");
+    const error = document.getElementById("answer-check-error");
+    if (!form || !error || !window.crypto || !crypto.subtle) return;
+    let passed = false;
+
+    // capture phase: runs before oTree's handler that disables the next button
+    form.addEventListener(
+      "submit",
+      async function (e) {
+        if (passed) return;
+        e.preventDefault();
+        e.stopImmediatePropagation();
+        let numWrong = 0;
+        for (const [name, expected] of Object.entries(js_vars.answer_digests)) {
+          const checked = form.querySelector('input[name="' + name + '"]:checked');
+          if (!checked || (await answerDigest(name, checked.value)) !== expected) numWrong++;
+        }
+        if (numWrong === 0) {
+          passed = true;
+          form.requestSubmit ? form.requestSubmit() : form.submit();
+          return;
+        }
+        // same message as ComprehensionCheck.error_message
+        error.innerHTML =
+          "You have " + numWrong + " incorrect answer(s). Please " +
+          '<a href="#instructionsCollapse" data-show-instructions>review the instructions</a> and try again.';
+        error.style.display = "block";
+        error.scrollIntoView({ behavior: "smooth" });
+      },
+      true
+    );
+  }
+
+  // Links in error messages that open the collapsed instructions (ComprehensionCheck)
+  document.addEventListener("click", function (e) {
+    const link = e.target.closest("[data-show-instructions]");
+    const instructions = document.getElementById("instructionsCollapse");
+    if (!link || !instructions) return;
+    e.preventDefault();
+    instructions.classList.add("show");
+    instructions.scrollIntoView({ behavior: "smooth" });
+  });
+
+  // Market page (live_round): the buyer's decision goes through liveSend, and the
+  // result arrives through liveRecv for both players
+  function initMarket() {
+    const resultPanel = document.getElementById("result-panel");
+    if (!resultPanel || typeof liveSend !== "function") return;
+    let resultPoll = null;
+
+    function showResult(data) {
+      document.getElementById("result-decision").textContent = data.buyer_decision
+        ? "The buyer bought the product and paid " + data.price_paid + " tokens."
+        : "The buyer did not buy the product.";
+      document.getElementById("result-payoff").textContent = js_vars.is_buyer
+        ? data.buyer_payoff
+        : data.seller_payoff;
+      for (const id of ["decision-panel", "waiting-panel"]) {
+        const panel = document.getElementById(id);
+        if (panel) panel.style.display = "none";
+      }
+      resultPanel.style.display = "block";
+      document.getElementById("next-panel").style.display = "block";
+    }
+
+    window.liveRecv = function (data) {
+      if (data.type === "result") {
+        clearInterval(resultPoll);
+        showResult(data);
+      } else if (data.type === "error") {
+        document.getElementById("decision-error").textContent = data.message;
+        document.getElementById("decision-submit").disabled = false;
+      }
+    };
+
+    // picks up the result if the round already finished (e.g. after a reload)
+    liveSend({ type: "load" });
+
+    if (!js_vars.is_buyer) {
+      // a stand-in decision for an inactive buyer is not pushed to this page
+      resultPoll = setInterval(function () {
+        liveSend({ type: "load" });
+      }, 5000);
+      return;
+    }
+    const priceField = document.getElementById("price-field");
+    const priceInput = document.getElementById("live-price");
+    const submit = document.getElementById("decision-submit");
+
+    document.querySelectorAll('input[name="live_decision"]').forEach(function (radio) {
+      radio.addEventListener("change", function () {
+        priceField.style.display = radio.value === "yes" && radio.checked ? "block" : "none";
+      });
+    });
+
+    submit.addEventListener("click", function () {
+      const checked = document.querySelector('input[name="live_decision"]:checked');
+      const error = document.getElementById("decision-error");
+      if (!checked) {
+        error.textContent = "Please choose whether you want to buy Product A.";
+        return;
+      }
+      const buying = checked.value === "yes";
+      // same rules as live_method, which checks again
+      if (buying && priceInput.value === "") {
+        error.textContent = js_vars.missing_price_message;
+        return;
+      }
+      if (buying && !priceInput.checkValidity()) {
+        const notWhole = priceInput.validity.stepMismatch || priceInput.validity.badInput;
+        error.textContent = notWhole
+          ? "Please enter a whole number of tokens."
+          : "Please enter a number between 0 and " + js_vars.max_price + ".";
+        return;
+      }
+      error.textContent = "";
+      submit.disabled = true;
+      liveSend({
+        type: "decision",
+        buyer_decision: buying,
+        price_paid: buying && priceInput.value !== "" ? Number(priceInput.value) : null,
+      });
+    });
+  }
+
+  document.addEventListener("DOMContentLoaded", function () {
+    initShowIf();
+    initCountUp();
+    initJsonList();
+    initAnswerCheck();
+    initMarket();
+  });
+})();
@@ -0,0 +1,47 @@
+"""
+Benchmark for the session design engine (my_game/design.py).
+
+Times build_design for growing session sizes and reports the cost per
+participant, which should stay roughly flat (linear total cost).
+
+Usage (from the myexperiment folder):
+    python benchmarks/bench_design.py
+    python benchmarks/bench_design.py 10 100 1000 --repeat 20
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Importing the app needs a database URL; the benchmark never touches it
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+from my_game import C, design  # noqa: E402
+
+DEFAULT_SIZES = [10, 50, 100, 200, 500, 1000]
+
+
+def time_build(num_participants, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        design.build_design(C, num_participants)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("sizes", nargs="*", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'participants':>12} {'total ms':>10} {'us/participant':>15}")
+    for n in args.sizes:
+        best = time_build(n, args.repeat)
+        print(f"{n:>12} {best * 1e3:>10.2f} {best * 1e6 / n:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
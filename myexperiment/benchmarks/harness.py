@@ -0,0 +1,49 @@
+"""
+Shared setup for benchmarks that run the oTree project in-process.
+
+Import this before anything from otree or my_game, then call setup_otree().
+By default the database is an in-memory SQLite, like `otree test`;
+pass a database URL (e.g. a local Postgres) to benchmark against that instead.
+"""
+import logging
+import os
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SESSION_CONFIG_NAME = "decision_making_game"
+
+
+def setup_otree(database_url=None):
+    """Load settings, apps and the ORM, like the otree command does"""
+    os.chdir(PROJECT_DIR)
+    if PROJECT_DIR not in sys.path:
+        sys.path.insert(0, PROJECT_DIR)
+    if database_url:
+        os.environ["DATABASE_URL"] = database_url
+    else:
+        os.environ["OTREE_IN_MEMORY"] = "1"
+
+    from otree.main import setup
+
+    setup()
+    # otree logs every bot submission at INFO
+    logging.getLogger("otree").setLevel(logging.WARNING)
+
+
+def create_session(num_participants, **config_overrides):
+    """Create a session of the project's session config"""
+    from otree.session import create_session as otree_create_session
+
+    return otree_create_session(
+        session_config_name=SESSION_CONFIG_NAME,
+        num_participants=num_participants,
+        modified_session_config_fields=config_overrides or None,
+    )
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
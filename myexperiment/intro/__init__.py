@@ -0,0 +1,224 @@
+from otree.api import *
+import hashlib
+
+from my_game import metrics, profiling
+
+
+doc = """
+Before the market: informed consent, the game instructions and the
+comprehension check, shown once (the 18 rounds are in my_game).
+"""
+
+
+class C(BaseConstants):
+    NAME_IN_URL = "intro"
+    PLAYERS_PER_GROUP = None
+    NUM_ROUNDS = 1
+
+
+class Subsession(BaseSubsession):
+    pass
+
+
+class Group(BaseGroup):
+    pass
+
+
+class Player(BasePlayer):
+    # Comprehension check answers
+    comp_q1 = models.BooleanField(
+        label="As a Seller, you have the option to either Accept or Reject the price offering made by the Buyer.",
+        choices=[[True, "True"], [False, "False"]],
+    )
+    comp_q2 = models.BooleanField(
+        label="As a Buyer, your utility for the product will remain the same in every round of the experiment.",
+        choices=[[True, "True"], [False, "False"]],
+    )
+    comp_q3 = models.StringField(
+        label="What happens if the Buyer chooses NOT to buy Product A?",
+        choices=[
+            ["a", "The Buyer keeps their endowment, and the Seller receives 0."],
+            ["b", "The Buyer pays a small penalty fee."],
+            ["c", "The Buyer receives the utility of the product anyway."],
+            ["d", "Both the Buyer and the Seller receive 0 for that round."],
+        ],
+        widget=widgets.RadioSelect,
+    )
+    comp_q4 = models.StringField(
+        label="Is it possible for the Seller to have a negative payoff in a round?",
+        choices=[
+            ["a", "No, the Seller always makes a profit."],
+            ["b", "No, the lowest the Seller can earn is 0."],
+            ["c", "Yes, if the Buyer pays an amount lower than the production cost."],
+            ["d", "Yes, if the Buyer decides not to buy the product."],
+        ],
+        widget=widgets.RadioSelect,
+    )
+    comp_q5 = models.BooleanField(
+        label="The Seller starts every round with an endowment of 100 tokens.",
+        choices=[[True, "True"], [False, "False"]],
+    )
+    comp_q6 = models.StringField(
+        label="Regarding the information shown on screen, which of the following is correct?",
+        choices=[
+            ["a", "The Buyer can see the Seller's production cost."],
+            ["b", "The Seller can see the Buyer's utility value."],
+            [
+                "c",
+                "The Buyer sees their own utility, and the Seller sees their own production cost.",
+            ],
+            [
+                "d",
+                "The Buyer sees their own utility value and the Seller’s production cost.",
+            ],
+        ],
+        widget=widgets.RadioSelect,
+    )
+    comp_q7 = models.BooleanField(
+        label="If the Buyer decides to buy the product, they receive the product at whatever price they pay.",
+        choices=[[True, "True"], [False, "False"]],
+    )
+
+    # Consent Form Fields
+    consent_1 = models.BooleanField(
+        label="1. I have read and understood the Purpose of the Research.",
+        widget=widgets.CheckboxInput,
+    )
+    consent_2 = models.BooleanField(
+        label="2. I have read and understood what I will be asked to do in the research.",
+        widget=widgets.CheckboxInput,
+    )
+    consent_3 = models.BooleanField(
+        label="3. I have read and understood the potential Benefits to me.",
+        widget=widgets.CheckboxInput,
+    )
+    consent_4 = models.BooleanField(
+        label="4. I have read and understood the potential Risks and Discomforts.",
+        widget=widgets.CheckboxInput,
+    )
+    consent_5 = models.BooleanField(
+        label="5. I have read and understood that my participation is completely Voluntary.",
+        widget=widgets.CheckboxInput,
+    )
+    consent_6 = models.BooleanField(
+        label="6. I have read and understood that my Withdrawal from the Study will not have any repercussion.",
+        widget=widgets.CheckboxInput,
+    )
+    consent_7 = models.BooleanField(
+        label="7. I have read and understood the Data Collection method(s).",
+        widget=widgets.CheckboxInput,
+    )
+    consent_8 = models.BooleanField(
+        label="8. I have read and understood about the steps taken to ensure Confidentiality.",
+        widget=widgets.CheckboxInput,
+    )
+    consent_9 = models.BooleanField(
+        label="9. I have read and understood that I can ask the research team to answer any Questions and concerns about the research and my participation.",
+        widget=widgets.CheckboxInput,
+    )
+    consent_10 = models.BooleanField(
+        label="10. I have read and understood that the research study has been approved by Fulbright University Vietnam’s Institutional Review Board (IRB).",
+        widget=widgets.CheckboxInput,
+    )
+    consent_final = models.BooleanField(
+        label="I have read and fully understood the contents of this form and had time to ask my questions, and hereby give my informed consent to the researchers and affirm my willingness to participate in the research described above in this form.",
+        widget=widgets.CheckboxInput,
+    )
+
+    def comp_check_failed(self):
+        """Check if comprehension questions were answered correctly"""
+        return self.comp_q1 is not False or self.comp_q2 is not False
+
+
+COMPREHENSION_SOLUTIONS = dict(
+    comp_q1=False,
+    comp_q2=False,
+    comp_q3="a",
+    comp_q4="c",
+    comp_q5=False,
+    comp_q6="c",
+    comp_q7=True,
+)
+
+
+def answer_digest(salt, name, answer):
+    """
+    Salted SHA-256 of a comprehension answer, as the browser computes it from
+    the radio button's value ("True", "a", ...). This keeps the solutions out
+    of the page source, but with 2 to 4 choices per question it hides nothing
+    from someone determined; ComprehensionCheck.error_message stays the real check.
+    """
+    text = f"{salt}:{name}:{answer}"
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+# PAGES
+class Introduction(Page):
+    pass
+
+
+class ConsentForm(Page):
+    form_model = "player"
+    form_fields = [
+        "consent_1",
+        "consent_2",
+        "consent_3",
+        "consent_4",
+        "consent_5",
+        "consent_6",
+        "consent_7",
+        "consent_8",
+        "consent_9",
+        "consent_10",
+        "consent_final",
+    ]
+
+    @staticmethod
+    def vars_for_template(player: Player):
+        import datetime
+        return dict(date_today=datetime.date.today().strftime("%Y-%m-%d"))
+
+
+class ComprehensionCheck(Page):
+    form_model = "player"
+    form_fields = [
+        "comp_q1",
+        "comp_q2",
+        "comp_q3",
+        "comp_q4",
+        "comp_q5",
+        "comp_q6",
+        "comp_q7",
+    ]
+
+    @staticmethod
+    def js_vars(player: Player):
+        """Digests of the solutions, for the check in the browser (see _assets/pwyw.js)"""
+        salt = player.participant.code
+        return dict(
+            answer_salt=salt,
+            answer_digests={
+                name: answer_digest(salt, name, answer)
+                for name, answer in COMPREHENSION_SOLUTIONS.items()
+            },
+        )
+
+    @staticmethod
+    def error_message(player: Player, values):
+        """Validate comprehension check answers and show error with link to instructions if incorrect"""
+        num_wrong = 0
+        for key, answer in COMPREHENSION_SOLUTIONS.items():
+            if values[key] != answer:
+                num_wrong += 1
+
+        if num_wrong > 0:
+            return (
+                f"You have {num_wrong} incorrect answer(s). "
+                # the link opens the instructions panel (see _assets/pwyw.js)
+                'Please <a href="#instructionsCollapse" data-show-instructions>review the instructions</a> and try again.'
+            )
+
+
+page_sequence = [ConsentForm, Introduction, ComprehensionCheck]
+metrics.instrument_pages(page_sequence)
+profiling.instrument_app(__name__)
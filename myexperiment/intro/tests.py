@@ -0,0 +1,34 @@
+from otree.api import *
+
+from . import *
+
+
+CONSENT = {f"consent_{i}": True for i in range(1, 11)}
+CONSENT["consent_final"] = True
+
+COMPREHENSION_ANSWERS = dict(
+    comp_q1=False,
+    comp_q2=False,
+    comp_q3="a",
+    comp_q4="c",
+    comp_q5=False,
+    comp_q6="c",
+    comp_q7=True,
+)
+
+
+class PlayerBot(Bot):
+    def play_round(self):
+        yield ConsentForm, CONSENT
+        yield Introduction
+        # a first attempt with one wrong answer, like many participants
+        yield SubmissionMustFail(ComprehensionCheck, dict(COMPREHENSION_ANSWERS, comp_q7=False))
+        yield ComprehensionCheck, COMPREHENSION_ANSWERS
+        self.check_answer_digests()
+
+    def check_answer_digests(self):
+        """The check in the browser accepts the answers the server accepts"""
+        digests = ComprehensionCheck.js_vars(self.player)["answer_digests"]
+        for name, answer in COMPREHENSION_ANSWERS.items():
+            # the browser hashes the radio button's value, e.g. "False"
+            expect(answer_digest(self.participant.code, name, str(answer)), digests[name])
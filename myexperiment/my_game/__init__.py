@@ -1,17 +1,31 @@
-from otree.api import *
 import random
+import secrets
+import time
+
+from otree.api import *
+from otree.database import db, dbq
+from otree.models import Participant
+from sqlalchemy import Index
+
+from . import assets, design, metrics, profiling
 
 
 doc = """
 Pay-What-You-Want (PWYW) Game: 2 participants are randomly matched as Buyer and Seller.
 The Buyer decides whether to buy a product and how much to pay.
 The Seller receives payment minus production cost.
+Runs between the intro app (consent, instructions) and the outro app (questionnaire, payment).
 """
 
+# long-lived caching of the fingerprinted bundles in _static/pwyw (see assets.py)
+assets.install_cache_headers()
+# page timings and page occupancy at /metrics (see metrics.py)
+metrics.install_endpoint()
+
 
 class C(BaseConstants):
     NAME_IN_URL = "my_game"
-    PLAYERS_PER_GROUP = None  # Will vary each round
+    PLAYERS_PER_GROUP = None  # Buyer and Seller pairs, made in creating_session
     NUM_ROUNDS = 18
 
     # Roles
@@ -27,13 +41,34 @@ class C(BaseConstants):
     HIGH_SUGGESTED = "high_suggested"
     LOW_SUGGESTED = "low_suggested"
 
+    TREATMENTS = (CONTROL, HIGH_SUGGESTED, LOW_SUGGESTED)
+    # One letter per treatment, in TREATMENTS order (participant.treatment_order)
+    TREATMENT_LETTERS = "CHL"
+
+    # Design: 3 blocks of 6 rounds, each block balanced in treatments and roles
+    ROUNDS_PER_BLOCK = 6
+
+    # Buyer utility and seller production cost ranges (inclusive)
+    UTILITY_MIN = 15
+    UTILITY_MAX = 45
+    COST_MIN = 1
+    COST_MAX = 30
+
     # Suggested prices
-    # Dynamic now, calculated in creating_session
+    # Dynamic, calculated from the production cost (see design.suggested_price_for)
+    HIGH_SUGGESTED_MULTIPLIER = 1.5
 
     # Payment constants
     SHOW_UP_FEE = 100
     CONVERSION_RATE = 200
 
+    # Round pages of a participant flagged as dropout are auto-submitted this fast
+    STAND_IN_TIMEOUT_SECONDS = 3
+
+    # Arrival matching: how long a participant waits for an active partner before
+    # being paired with a stand-in (see ARRIVAL MATCHING)
+    ARRIVAL_PATIENCE_SECONDS = 30
+
 
 class Subsession(BaseSubsession):
     pass
@@ -43,128 +78,121 @@ def creating_session(subsession: Subsession):
     """
     Initialize the session:
     - Randomize treatment order for EACH participant
-    - Re-match players each round (no repeats)
+    - Re-match players each round (perfect stranger: no repeats while there are
+      at least as many pairs as rounds, otherwise as few as possible)
     - Equal buyers and sellers each round
+    - With the cohort_size session config, all of this within independent cohorts
+      (matching pools), each with its own role schedule and paying round
+    - With the arrival_matching session config, only the participants' part of the
+      design: the pairs are formed as they arrive (see ARRIVAL MATCHING)
+
+    The full design for all rounds is built once in round 1 (see design.py),
+    from the session's own seeded generator (see RANDOMNESS);
+    every round then only applies its own slice of it. The arrays are only
+    needed here, so they leave session.vars after the last round; what the
+    pages need is kept in the declared fields (see DESIGN STATE).
     """
+    session = subsession.session
+
     # --- 1. SESSION LEVEL SETUP (Round 1 only) ---
     if subsession.round_number == 1:
-        # A. Treatment Randomization (Existing)
-        # Define all treatment conditions (6 rounds x 3 repeats = 18 rounds)
-        # Each block of 6 has: 2 Control, 2 Low, 2 High
-        one_block = [C.CONTROL] * 2 + [C.HIGH_SUGGESTED] * 2 + [C.LOW_SUGGESTED] * 2
-        all_treatments = one_block * 3
-
-        # EACH participant gets a randomized order of treatments
-        # Also assign Rule Groups (A and B) for Role Balancing here
-        participants = subsession.session.get_participants()
-        random.shuffle(participants) # Shuffle to randomize who gets into Group A vs B
-
-        mid_point = len(participants) // 2
-
-        for i, p in enumerate(participants):
-            # 1. Treatment Order
-            shuffled_treatments = all_treatments.copy()
-            random.shuffle(shuffled_treatments)
-            p.vars["treatment_order"] = shuffled_treatments
-
-            # 2. Role Group Assignment (Strict Balance)
-            # First half is Group A, Second half is Group B
-            if i < mid_point:
-                p.vars['role_group'] = 'A'
-            else:
-                p.vars['role_group'] = 'B'
-
-        # B. Generate Role Schedule for the Session
-        # 0 = Group A is Buyer (Group B is Seller)
-        # 1 = Group B is Buyer (Group A is Seller)
-        # Constraint: In every 6 rounds, exactly 3 are '0' and 3 are '1'
-        role_schedule = []
-        for _ in range(3): # 3 Blocks
-            # Create balanced block [0,0,0, 1,1,1]
-            block = [0, 0, 0, 1, 1, 1]
-            random.shuffle(block)
-            role_schedule.extend(block)
-
-        subsession.session.vars['role_schedule'] = role_schedule
-
-        # C. Select Common Paying Round
-        # Select ONE round (1 to 18) that determines payment for EVERYONE
-        paying_round = random.randint(1, C.NUM_ROUNDS)
-        subsession.session.vars['paying_round'] = paying_round
-
-    # --- 2. MATCHING LOGIC (Every Round) ---
-
-    # Who is the Buyer this round? (Group A or Group B)
-    # round_number is 1-indexed, so subtract 1
-    current_round_config = subsession.session.vars['role_schedule'][subsession.round_number - 1]
-    is_group_A_buyer = (current_round_config == 0)
-
-    # Separate players into Buyers and Sellers list
-    buyers = []
-    sellers = []
-
-    for p in subsession.get_players():
-        # Get their assigned group
-        p_group = p.participant.vars['role_group']
-
-        if is_group_A_buyer:
-            if p_group == 'A':
-                buyers.append(p)
-            else:
-                sellers.append(p)
-        else: # Group B is Buyer
-            if p_group == 'B':
-                buyers.append(p)
-            else:
-                sellers.append(p)
-
-    # Basic validation
-    if len(buyers) != len(sellers):
-        raise ValueError("Error: Uneven number of buyers and sellers. Ensure even number of participants.")
-
-    # Randomize the matching within the groups
-    random.shuffle(buyers)
-    random.shuffle(sellers)
-
-    # Pair them up
-    group_matrix = []
-    for b, s in zip(buyers, sellers):
-        group_matrix.append([b, s])
-
-    subsession.set_group_matrix(group_matrix)
-
-    # Assign roles and treatments for each group
-    for group in subsession.get_groups():
-        players_in_group = group.get_players()
-        buyer = players_in_group[0]
-        seller = players_in_group[1]
-
-        # Assign roles
-        buyer.participant.vars[f"role_round_{subsession.round_number}"] = C.BUYER_ROLE
-        seller.participant.vars[f"role_round_{subsession.round_number}"] = C.SELLER_ROLE
-
-        # Get treatment for this buyer (from their randomized order)
-        buyer_treatment = buyer.participant.vars["treatment_order"][
-            subsession.round_number - 1
+        # 0 draws a new seed, so drawn seeds are never 0
+        session.seed = session.config.get('seed') or secrets.randbelow(2**32 - 1) + 1
+        participants = session.get_participants()
+        plan = design.build_cohort_design(
+            C, len(participants), session.config.get('cohort_size'), session_rng(session, 'design')
+        )
+        if not arrival_matching(session):
+            session.vars['design'] = plan
+        session.role_schedule = [
+            design.role_schedule_letters(schedule) for schedule in plan['role_schedule']
         ]
-        group.treatment = buyer_treatment
+        session.paying_round = plan['paying_round']
+
+        for p in participants:
+            idx = p.id_in_session - 1
+            p.cohort = plan['cohort'][idx] + 1
+            p.treatment_order = design.treatment_order_letters(C, plan, idx)
+            p.role_group = 'A' if plan['role_group'][idx] == design.GROUP_A else 'B'
 
-        # Set utility value for buyer (randomized between 15-45)
-        group.product_utility = random.randint(15, 45)
+    # --- 2. MATCHING LOGIC (Every Round) ---
+    if arrival_matching(session):
+        return
+    if subsession.round_number == C.NUM_ROUNDS:
+        plan = session.vars.pop('design')
+    else:
+        plan = session.vars['design']
+    apply_round_design(subsession, plan)
 
-        # Set production cost for seller (randomized between 1-30)
-        group.production_cost = random.randint(1, 30)
 
-        # Calculate Suggested Price
-        if group.treatment == C.CONTROL:
-            group.suggested_price = None
-        elif group.treatment == C.LOW_SUGGESTED:
-            group.suggested_price = group.production_cost
-        elif group.treatment == C.HIGH_SUGGESTED:
-            group.suggested_price = round(1.5 * group.production_cost)
+def apply_round_design(subsession: Subsession, plan):
+    """
+    Pair the players and set the groups' treatment, utility, cost and suggested
+    price for one round, with one bulk UPDATE of the Player and one of the Group
+    rows. set_group_matrix would delete and recreate the groups and commit once
+    per group, which made creating large sessions slow. oTree has created one
+    group with all players (PLAYERS_PER_GROUP = None); it becomes the first pair
+    and the others are added with one bulk INSERT.
+    Buyer first in every pair: id_in_group 1 is C.BUYER_ROLE, 2 is C.SELLER_ROLE.
+    """
+    orm_session = db._db  # otree's db wrapper does not forward the bulk methods
+    num_pairs = plan['num_pairs']
+    orm_session.bulk_insert_mappings(
+        Group,
+        [
+            dict(
+                session_id=subsession.session.id,
+                subsession_id=subsession.id,
+                round_number=subsession.round_number,
+                id_in_subsession=id_in_subsession,
+            )
+            for id_in_subsession in range(2, num_pairs + 1)
+        ],
+    )
+    player_ids = dict(
+        dbq(Player)
+        .join(Participant, Player.participant_id == Participant.id)
+        .filter(Player.subsession_id == subsession.id)
+        .with_entities(Participant.id_in_session, Player.id)
+    )
+    group_ids = (
+        dbq(Group)
+        .filter(Group.subsession_id == subsession.id)
+        .order_by(Group.id_in_subsession)
+        .with_entities(Group.id)
+    )
+
+    player_rows = []
+    group_rows = []
+    start, _ = design.round_slice(plan, subsession.round_number)
+    for i, (group_id,) in enumerate(group_ids, start=start):
+        buyer = plan['buyer'][i]
+        for id_in_group, idx, role in (
+            (1, buyer, C.BUYER_ROLE),
+            (2, plan['seller'][i], C.SELLER_ROLE),
+        ):
+            player_rows.append(
+                dict(id=player_ids[idx + 1], group_id=group_id, id_in_group=id_in_group, _role=role)
+            )
+        suggested_price = plan['suggested'][i]
+        group_rows.append(
+            dict(
+                id=group_id,
+                cohort=plan['cohort'][buyer] + 1,
+                treatment=C.TREATMENTS[plan['treatment'][i]],
+                product_utility=plan['utility'][i],
+                production_cost=plan['cost'][i],
+                suggested_price=(
+                    None if suggested_price == design.NO_SUGGESTED_PRICE else suggested_price
+                ),
+            )
+        )
+    orm_session.bulk_update_mappings(Player, player_rows)
+    orm_session.bulk_update_mappings(Group, group_rows)
 
 
 class Group(BaseGroup):
+    cohort = models.IntegerField()
     treatment = models.StringField()
     product_utility = models.IntegerField()
     production_cost = models.IntegerField()
@@ -178,11 +206,34 @@ class Group(BaseGroup):
         max=C.BUYER_ENDOWMENT,
         blank=True,
     )
+    # Seconds the buyer took to decide, and whether they missed the decision deadline
+    # (see DECISION TIMEOUTS)
+    decision_seconds = models.FloatField()
+    decision_timed_out = models.BooleanField(initial=False)
+
+    # (buyer, seller), filled on first access and kept for the rest of the request
+    _buyer_seller = ()
+
+    def _players_by_role(self):
+        if not self._buyer_seller:
+            # creating_session puts the buyer first in every pair
+            self._buyer_seller = tuple(self.get_players())
+        return self._buyer_seller
+
+    @property
+    def buyer(self):
+        """The player with C.BUYER_ROLE in this group"""
+        return self._players_by_role()[0]
+
+    @property
+    def seller(self):
+        """The player with C.SELLER_ROLE in this group"""
+        return self._players_by_role()[1]
 
     def set_payoffs(self):
         """Calculate payoffs for buyer and seller"""
-        buyer = [p for p in self.get_players() if p.role() == C.BUYER_ROLE][0]
-        seller = [p for p in self.get_players() if p.role() == C.SELLER_ROLE][0]
+        buyer = self.buyer
+        seller = self.seller
 
         # Calculate potential payoffs logic
         if self.buyer_decision and self.price_paid is not None:
@@ -200,365 +251,556 @@ class Group(BaseGroup):
 
         # ONLY set the official player.payoff if this is the chosen paying round
         # This ensures the "Total Payments" in admin interface is correct strategy-wise
-        paying_round = self.session.vars.get('paying_round')
-
-        if self.round_number == paying_round:
-            buyer.payoff = buyer_val
-            seller.payoff = seller_val
+        if self.round_number == paying_round(self.session, self.cohort):
+            record_payment(buyer, buyer_val)
+            record_payment(seller, seller_val)
         else:
             buyer.payoff = 0
             seller.payoff = 0
 
 
 class Player(BasePlayer):
-    # Comprehension check answers
-    comp_q1 = models.BooleanField(
-        label="As a Seller, you have the option to either Accept or Reject the price offering made by the Buyer.",
-        choices=[[True, "True"], [False, "False"]],
-    )
-    comp_q2 = models.BooleanField(
-        label="As a Buyer, your utility for the product will remain the same in every round of the experiment.",
-        choices=[[True, "True"], [False, "False"]],
-    )
-    comp_q3 = models.StringField(
-        label="What happens if the Buyer chooses NOT to buy Product A?",
-        choices=[
-            ["a", "The Buyer keeps their endowment, and the Seller receives 0."],
-            ["b", "The Buyer pays a small penalty fee."],
-            ["c", "The Buyer receives the utility of the product anyway."],
-            ["d", "Both the Buyer and the Seller receive 0 for that round."],
-        ],
-        widget=widgets.RadioSelect,
-    )
-    comp_q4 = models.StringField(
-        label="Is it possible for the Seller to have a negative payoff in a round?",
-        choices=[
-            ["a", "No, the Seller always makes a profit."],
-            ["b", "No, the lowest the Seller can earn is 0."],
-            ["c", "Yes, if the Buyer pays an amount lower than the production cost."],
-            ["d", "Yes, if the Buyer decides not to buy the product."],
-        ],
-        widget=widgets.RadioSelect,
-    )
-    comp_q5 = models.BooleanField(
-        label="The Seller starts every round with an endowment of 100 tokens.",
-        choices=[[True, "True"], [False, "False"]],
-    )
-    comp_q6 = models.StringField(
-        label="Regarding the information shown on screen, which of the following is correct?",
-        choices=[
-            ["a", "The Buyer can see the Seller's production cost."],
-            ["b", "The Seller can see the Buyer's utility value."],
-            [
-                "c",
-                "The Buyer sees their own utility, and the Seller sees their own production cost.",
-            ],
-            [
-                "d",
-                "The Buyer sees their own utility value and the Seller’s production cost.",
-            ],
-        ],
-        widget=widgets.RadioSelect,
-    )
-    comp_q7 = models.BooleanField(
-        label="If the Buyer decides to buy the product, they receive the product at whatever price they pay.",
-        choices=[[True, "True"], [False, "False"]],
-    )
-
     # For data analysis: store the payoff this player WOULD have gotten in this round
     potential_payoff = models.CurrencyField()
 
-    # Consent Form Fields
-    consent_1 = models.BooleanField(
-        label="1. I have read and understood the Purpose of the Research.",
-        widget=widgets.CheckboxInput,
-    )
-    consent_2 = models.BooleanField(
-        label="2. I have read and understood what I will be asked to do in the research.",
-        widget=widgets.CheckboxInput,
-    )
-    consent_3 = models.BooleanField(
-        label="3. I have read and understood the potential Benefits to me.",
-        widget=widgets.CheckboxInput,
-    )
-    consent_4 = models.BooleanField(
-        label="4. I have read and understood the potential Risks and Discomforts.",
-        widget=widgets.CheckboxInput,
-    )
-    consent_5 = models.BooleanField(
-        label="5. I have read and understood that my participation is completely Voluntary.",
-        widget=widgets.CheckboxInput,
-    )
-    consent_6 = models.BooleanField(
-        label="6. I have read and understood that my Withdrawal from the Study will not have any repercussion.",
-        widget=widgets.CheckboxInput,
-    )
-    consent_7 = models.BooleanField(
-        label="7. I have read and understood the Data Collection method(s).",
-        widget=widgets.CheckboxInput,
-    )
-    consent_8 = models.BooleanField(
-        label="8. I have read and understood about the steps taken to ensure Confidentiality.",
-        widget=widgets.CheckboxInput,
-    )
-    consent_9 = models.BooleanField(
-        label="9. I have read and understood that I can ask the research team to answer any Questions and concerns about the research and my participation.",
-        widget=widgets.CheckboxInput,
-    )
-    consent_10 = models.BooleanField(
-        label="10. I have read and understood that the research study has been approved by Fulbright University Vietnam’s Institutional Review Board (IRB).",
-        widget=widgets.CheckboxInput,
-    )
-    consent_final = models.BooleanField(
-        label="I have read and fully understood the contents of this form and had time to ask my questions, and hereby give my informed consent to the researchers and affirm my willingness to participate in the research described above in this form.",
-        widget=widgets.CheckboxInput,
-    )
+    # True if a page of this round timed out and was played by the stand-in
+    auto_played = models.BooleanField(initial=False)
 
-    # Questionnaire Part 1
-    q_fair_price = models.IntegerField(
-        label="My price paid for the product was fair toward the seller.",
-        choices=[
-            [1, "1 - Strongly Disagree"],
-            [2, "2"],
-            [3, "3"],
-            [4, "4"],
-            [5, "5"],
-            [6, "6"],
-            [7, "7 - Strongly Agree"],
-        ],
-        widget=widgets.RadioSelectHorizontal,
-    )
-    q_felt_good = models.IntegerField(
-        label="I felt good about the price I paid.",
-        choices=[
-            [1, "1 - Strongly Disagree"],
-            [2, "2"],
-            [3, "3"],
-            [4, "4"],
-            [5, "5"],
-            [6, "6"],
-            [7, "7 - Strongly Agree"],
-        ],
-        widget=widgets.RadioSelectHorizontal,
-    )
-    q_fair_to_seller = models.IntegerField(
-        label="I paid a higher price because I wanted to be fair to the seller.",
-        choices=[
-            [1, "1 - Strongly Disagree"],
-            [2, "2"],
-            [3, "3"],
-            [4, "4"],
-            [5, "5"],
-            [6, "6"],
-            [7, "7 - Strongly Agree"],
-        ],
-        widget=widgets.RadioSelectHorizontal,
-    )
-    q_guilty_low_price = models.IntegerField(
-        label="Paying a low price would have made me feel guilty.",
-        choices=[
-            [1, "1 - Strongly Disagree"],
-            [2, "2"],
-            [3, "3"],
-            [4, "4"],
-            [5, "5"],
-            [6, "6"],
-            [7, "7 - Strongly Agree"],
-        ],
-        widget=widgets.RadioSelectHorizontal,
-    )
-    q_reward_seller = models.IntegerField(
-        label="I paid a higher amount to reward the seller for their generosity.",
-        choices=[
-            [1, "1 - Strongly Disagree"],
-            [2, "2"],
-            [3, "3"],
-            [4, "4"],
-            [5, "5"],
-            [6, "6"],
-            [7, "7 - Strongly Agree"],
-        ],
-        widget=widgets.RadioSelectHorizontal,
-    )
-    q_obligated_fair = models.IntegerField(
-        label="I felt obligated to pay a fair price because the seller trusted me.",
-        choices=[
-            [1, "1 - Strongly Disagree"],
-            [2, "2"],
-            [3, "3"],
-            [4, "4"],
-            [5, "5"],
-            [6, "6"],
-            [7, "7 - Strongly Agree"],
-        ],
-        widget=widgets.RadioSelectHorizontal,
+    def role(self):
+        """Return the role for this player in current round (stored on the Player row)"""
+        return self._role
+
+
+# Lets exports and admin queries filter buyers and sellers of a round in SQL
+Index("my_game_player_round_role", Player.session_id, Player.round_number, Player._role)
+
+
+# DESIGN STATE
+# The parts of the design that pages need are declared in PARTICIPANT_FIELDS and
+# SESSION_FIELDS (settings.py), so they also get their own export columns:
+# - participant.cohort: the participant's cohort (matching pool), from 1
+# - participant.role_group: "A" or "B"
+# - participant.treatment_order: one of C.TREATMENT_LETTERS per round
+# - session.role_schedule: one string per cohort: per round, the role group that buys
+# - session.paying_round: one paying round per cohort, common to its participants
+# - session.seed: the seed of the session's random draws (see RANDOMNESS)
+# This oTree keeps declared fields in the pickled vars dict, and any access through
+# participant.vars / session.vars (including the declared attributes) flags that
+# dict as changed, so the whole blob is pickled and written back on commit. The
+# accessors below read _vars directly, which does not.
+def _read_field(obj, name, default=None):
+    return obj._vars.get(name, default)
+
+
+def cohort(participant):
+    return _read_field(participant, 'cohort', 1)
+
+
+def role_group(participant):
+    return _read_field(participant, 'role_group')
+
+
+def treatment_order(participant):
+    """The participant's treatments, one per round, as names from C.TREATMENTS"""
+    letters = _read_field(participant, 'treatment_order', '')
+    return [C.TREATMENTS[C.TREATMENT_LETTERS.index(letter)] for letter in letters]
+
+
+def role_schedule(session, cohort):
+    return _read_field(session, 'role_schedule')[cohort - 1]
+
+
+def paying_round(session, cohort):
+    return _read_field(session, 'paying_round')[cohort - 1]
+
+
+# RANDOMNESS
+# Nothing in a session draws from the module-level random, which all sessions on the
+# server share. Each use gets its own generator, seeded from session.seed and a name
+# for the use (e.g. "design"), so the draws of a session depend only on its seed: it
+# can be re-created exactly (see benchmarks/replay.py), and the draws of one use do
+# not depend on how many were made before by another.
+def session_rng(session, *use):
+    """A random.Random for one use in this session"""
+    return random.Random(":".join(map(str, (_read_field(session, 'seed'), *use))))
+
+
+# PAYMENT
+# A participant is paid C.SHOW_UP_FEE plus their payoff in the paying round, at least
+# 0 tokens, converted at C.CONVERSION_RATE. set_payoffs of the paying round stores the
+# result once in participant.paying_round_payoff and participant.payment_tokens, so
+# the payment page and the payment export (outro's custom_export) read it directly.
+def record_payment(player: Player, round_payoff):
+    """Store the participant's payment, from their payoff in the paying round"""
+    tokens = max(C.SHOW_UP_FEE + round_payoff, 0)
+    # the admin's Payments page adds the participation fee (the show-up fee in VND) to
+    # player.payoff, so it shows the same floored amount
+    player.payoff = tokens - C.SHOW_UP_FEE
+    participant = player.participant
+    participant.paying_round_payoff = round_payoff
+    participant.payment_tokens = tokens
+
+
+def payment(participant):
+    """The participant's payment (only the show-up fee until the paying round is played)"""
+    tokens = _read_field(participant, 'payment_tokens', C.SHOW_UP_FEE)
+    return dict(
+        round_payoff=_read_field(participant, 'paying_round_payoff', 0),
+        tokens=tokens,
+        vnd=tokens * C.CONVERSION_RATE,
     )
-    q_suggested_influenced = models.IntegerField(
-        label="The suggested price influenced the amount I decided to pay.",
-        choices=[
-            [1, "1 - Strongly Disagree"],
-            [2, "2"],
-            [3, "3"],
-            [4, "4"],
-            [5, "5"],
-            [6, "6"],
-            [7, "7 - Strongly Agree"],
-        ],
-        widget=widgets.RadioSelectHorizontal,
+
+
+# ROUND LEDGER
+# One compact (round_number, role, treatment, potential_payoff) tuple per played round,
+# kept on the participant so history pages need one fetch instead of one per round.
+def record_round(player: Player):
+    """Append this round's outcome to the participant's round ledger"""
+    player.participant.vars.setdefault('round_ledger', []).append(
+        (
+            player.round_number,
+            player.role(),
+            player.group.treatment,
+            int(player.potential_payoff),
+        )
     )
-    q_suggested_guide = models.IntegerField(
-        label="I used the suggested price as a guide for what was appropriate to pay.",
-        choices=[
-            [1, "1 - Strongly Disagree"],
-            [2, "2"],
-            [3, "3"],
-            [4, "4"],
-            [5, "5"],
-            [6, "6"],
-            [7, "7 - Strongly Agree"],
+
+
+def ledger_history(participant, selected_round_number=None):
+    """Rows for the round history table, read from the round ledger"""
+    return [
+        dict(
+            round_number=round_number,
+            role=role,
+            treatment=treatment,
+            payoff=payoff,
+            is_selected=(round_number == selected_round_number),
+        )
+        for round_number, role, treatment, payoff in _read_field(participant, 'round_ledger', [])
+    ]
+
+
+# MARKET STATS
+# Running per-treatment and per-round sums (counts, sums, sums of squares), updated
+# once per group and round, so the admin report never scans Player or Group rows.
+def record_market_stats(group: Group):
+    """Add this group's outcome to the session's running aggregates"""
+    stats = group.session.vars.setdefault('market_stats', dict(treatment={}, round={}))
+    bought = bool(group.field_maybe_none('buyer_decision'))
+    suggested_price = group.field_maybe_none('suggested_price')
+
+    for cells, key in (
+        (stats['treatment'], group.treatment),
+        (stats['round'], group.round_number),
+    ):
+        cell = cells.setdefault(
+            key,
+            dict(n=0, buys=0, price_sum=0, price_sq=0, ratio_n=0, ratio_sum=0.0, ratio_sq=0.0),
+        )
+        cell['n'] += 1
+        if bought:
+            price = group.price_paid
+            cell['buys'] += 1
+            cell['price_sum'] += price
+            cell['price_sq'] += price * price
+            if suggested_price:
+                ratio = price / suggested_price
+                cell['ratio_n'] += 1
+                cell['ratio_sum'] += ratio
+                cell['ratio_sq'] += ratio * ratio
+
+
+def _mean_sd(n, total, total_sq):
+    if not n:
+        return None, None
+    mean = total / n
+    if n < 2:
+        return mean, None
+    variance = max(total_sq - n * mean * mean, 0) / (n - 1)
+    return mean, variance ** 0.5
+
+
+def summarize_market_stats(cell):
+    """Buy rate, mean/sd of price paid (purchases) and of price / suggested price"""
+    mean_price, sd_price = _mean_sd(cell['buys'], cell['price_sum'], cell['price_sq'])
+    mean_ratio, sd_ratio = _mean_sd(cell['ratio_n'], cell['ratio_sum'], cell['ratio_sq'])
+    return dict(
+        n=cell['n'],
+        buy_rate=cell['buys'] / cell['n'] if cell['n'] else None,
+        mean_price=mean_price,
+        sd_price=sd_price,
+        mean_ratio=mean_ratio,
+        sd_ratio=sd_ratio,
+    )
+
+
+def _admin_report_row(label, cell):
+    summary = summarize_market_stats(cell)
+
+    def fmt(mean, sd=None):
+        if mean is None:
+            return ""
+        return f"{mean:.2f}" if sd is None else f"{mean:.2f} ({sd:.2f})"
+
+    return dict(
+        label=label,
+        n=summary['n'],
+        buy_rate=fmt(summary['buy_rate']),
+        price=fmt(summary['mean_price'], summary['sd_price']),
+        ratio=fmt(summary['mean_ratio'], summary['sd_ratio']),
+    )
+
+
+def vars_for_admin_report(subsession: Subsession):
+    stats = subsession.session.vars.get('market_stats', dict(treatment={}, round={}))
+    return dict(
+        treatment_rows=[
+            _admin_report_row(treatment, stats['treatment'][treatment])
+            for treatment in C.TREATMENTS
+            if treatment in stats['treatment']
         ],
-        widget=widgets.RadioSelectHorizontal,
-    )
-    q_suggested_quality = models.IntegerField(
-        label="I believe the suggested price reflects the true quality of the product.",
-        choices=[
-            [1, "1 - Strongly Disagree"],
-            [2, "2"],
-            [3, "3"],
-            [4, "4"],
-            [5, "5"],
-            [6, "6"],
-            [7, "7 - Strongly Agree"],
+        round_rows=[
+            _admin_report_row(round_number, cell)
+            for round_number, cell in sorted(stats['round'].items())
         ],
-        widget=widgets.RadioSelectHorizontal,
     )
 
-    # Questionnaire Part 2
-    dem_sex = models.StringField(
-        label="1. What is your sex?",
-        choices=["Male", "Female", "Prefer not to say"],
-        widget=widgets.RadioSelect,
-    )
-    dem_age = models.StringField(
-        label="2. How old are you?",
-        choices=[str(i) for i in range(18, 31)] + ["30+", "Prefer not to say"],
-    )
-    dem_employment = models.StringField(
-        label="3. What is your current employment status? (Select all that apply)",
-        blank=True,
-    )
-    dem_income = models.StringField(
-        label="4. Please indicate your net monthly income (Your total take-home pay after taxes, or the total money available to you including salary, allowances, and support):",
-        choices=[
-            "< 5,000,000 VND",
-            "5,000,000 - 10,000,000 VND",
-            "10,000,000 - 15,000,000 VND",
-            "15,000,000 - 20,000,000 VND",
-            "> 20,000,000 VND",
-            "Prefer not to say",
-        ],
-        widget=widgets.RadioSelect,
-    )
-    dem_familiar = models.StringField(
-        label="5. Are you familiar with the pricing strategy that is implemented in the experiment?",
-        choices=["Yes", "No"],
-        widget=widgets.RadioSelect,
-    )
-    dem_strategy_name = models.StringField(
-        label="(If Yes) What do you usually call this pricing strategy?", blank=True
-    )
 
+# EXPORT
+# Long format: one row per player-round with only the market columns
+EXPORT_HEADER = [
+    "session",
+    "participant",
+    "round_number",
+    "cohort",
+    "role",
+    "treatment",
+    "product_utility",
+    "production_cost",
+    "suggested_price",
+    "buyer_decision",
+    "price_paid",
+    "potential_payoff",
+    "auto_played",
+    "decision_seconds",
+    "decision_timed_out",
+]
 
-    def role(self):
-        """Return the role for this player in current round"""
-        return self.participant.vars.get(
-            f"role_round_{self.round_number}", C.BUYER_ROLE
+
+def custom_export(players):
+    """Yield one long-format row per player-round (see export.py for chunked streaming)"""
+    yield EXPORT_HEADER
+    for p in players:
+        group = p.group
+        yield [
+            p.session.code,
+            p.participant.code,
+            p.round_number,
+            group.field_maybe_none("cohort"),
+            p.role(),
+            group.field_maybe_none("treatment"),
+            group.field_maybe_none("product_utility"),
+            group.field_maybe_none("production_cost"),
+            group.field_maybe_none("suggested_price"),
+            group.field_maybe_none("buyer_decision"),
+            group.field_maybe_none("price_paid"),
+            p.field_maybe_none("potential_payoff"),
+            p.auto_played,
+            group.field_maybe_none("decision_seconds"),
+            group.decision_timed_out,
+        ]
+
+
+# ROUND FLOW
+def finish_round(group: Group):
+    """Everything that happens once the buyer has decided"""
+    group.set_payoffs()
+    record_round(group.buyer)
+    record_round(group.seller)
+    record_market_stats(group)
+
+
+def live_round(session):
+    """True when the session runs each round on the single live Market page"""
+    return bool(session.config.get("live_round"))
+
+
+MISSING_PRICE_MESSAGE = "Please enter how many tokens you want to transfer to the seller."
+
+
+def missing_price_error(buyer_decision, price_paid):
+    """Error message if the buyer buys without saying how much to pay"""
+    if buyer_decision and price_paid is None:
+        return MISSING_PRICE_MESSAGE
+
+
+def round_result(group: Group):
+    """Live message with the outcome of a finished round, for both players"""
+    return dict(
+        type="result",
+        buyer_decision=group.buyer_decision,
+        price_paid=group.price_paid,
+        buyer_payoff=int(group.buyer.potential_payoff),
+        seller_payoff=int(group.seller.potential_payoff),
+    )
+
+
+# DROPOUTS
+# A participant whose round page times out (dropout_timeout_seconds session config)
+# is flagged as a dropout, and from then on a stand-in plays for them: their round
+# pages time out after C.STAND_IN_TIMEOUT_SECONDS, and a stand-in buyer does not buy.
+# Dropouts wait in session.vars['dropout_pool'] until someone from the other role
+# group of their cohort drops out too. The two are then paired with each other in every later round
+# that none of the four players involved has reached yet, and their partners are
+# paired with each other. Only sellers change groups, so every group keeps one buyer
+# and one seller, roles still follow role_schedule, and the group's treatment stays
+# with its buyer.
+def is_dropout(participant):
+    return bool(_read_field(participant, 'is_dropout'))
+
+
+def round_timeout_seconds(player: Player):
+    """get_timeout_seconds of the round pages (None: no timeout)"""
+    if is_dropout(player.participant):
+        return C.STAND_IN_TIMEOUT_SECONDS
+    return player.session.config.get("dropout_timeout_seconds") or None
+
+
+def partner_of(player: Player):
+    group = player.group
+    return group.seller if player.role() == C.BUYER_ROLE else group.buyer
+
+
+def market_round_reached(participant):
+    """Round of this app the participant's current page belongs to (0 before it starts)"""
+    app_sequence = participant.session.config['app_sequence']
+    app_name = participant._current_app_name
+    if app_name == __name__:
+        return participant._round_number or 0
+    if app_name is None or app_sequence.index(app_name) < app_sequence.index(__name__):
+        return 0
+    return C.NUM_ROUNDS + 1
+
+
+def rematch_dropouts(player: Player, other: Player):
+    """Pair two dropouts from different role groups in the later rounds still open"""
+    for round_number in range(player.round_number + 1, C.NUM_ROUNDS + 1):
+        dropouts = (player.in_round(round_number), other.in_round(round_number))
+        groups = [p.group for p in dropouts]
+        if groups[0] == groups[1]:
+            continue
+        partners = [partner_of(p) for p in dropouts]
+        if any(is_dropout(p.participant) for p in partners):
+            continue
+        if any(market_round_reached(p.participant) >= round_number for p in (*dropouts, *partners)):
+            continue
+        # the dropouts have different roles, so exchanging the sellers pairs them
+        sellers = [group.seller for group in groups]
+        sellers[0].group, sellers[1].group = groups[1], groups[0]
+        for group in groups:
+            group._buyer_seller = ()
+
+
+def mark_dropout(player: Player):
+    """Flag the participant as a dropout and rematch them with a pooled dropout, if any"""
+    participant = player.participant
+    if is_dropout(participant):
+        return
+    participant.is_dropout = True
+    if arrival_matching(player.session):
+        # no pairs are fixed in advance: ArrivalWaitPage pairs dropouts with each other
+        return
+
+    pool = player.session.vars.setdefault('dropout_pool', [])
+    own_entry = [participant.id_in_session, role_group(participant), cohort(participant)]
+    for entry in pool:
+        id_in_session, other_role_group, other_cohort = entry
+        if other_role_group != own_entry[1] and other_cohort == own_entry[2]:
+            pool.remove(entry)
+            other = player.session.get_participants()[id_in_session - 1]
+            rematch_dropouts(
+                player, Player.objects_get(participant=other, round_number=player.round_number)
+            )
+            return
+    pool.append(own_entry)
+
+
+def mark_returned(player: Player):
+    """A dropout submitted a page again: play normally, but keep the new partners"""
+    participant = player.participant
+    participant.is_dropout = False
+    pool = player.session.vars.get('dropout_pool', [])
+    pool[:] = [entry for entry in pool if entry[0] != participant.id_in_session]
+
+
+def after_round_page(player: Player, timeout_happened):
+    """before_next_page of every round page"""
+    if timeout_happened:
+        player.auto_played = True
+        mark_dropout(player)
+    elif is_dropout(player.participant):
+        mark_returned(player)
+
+
+# DECISION TIMEOUTS
+# With the decision_timeout_seconds session config, the buyer's decision (the Decision
+# page, or the buyer's Market page) has a deadline. A buyer who misses it does not buy,
+# group.decision_timed_out is set and the round goes on, so the seller is not kept
+# waiting; unlike a timeout under dropout_timeout_seconds, this does not make the buyer
+# a dropout (in live rounds, where Market is the buyer's only page, buyers are then
+# never treated as dropouts: the deadline already keeps their sellers from waiting).
+# group.decision_seconds records how long each buyer took (from the end of
+# their previous page, to the second), and the same times feed the
+# pwyw_decision_seconds histogram at /metrics, to set the deadline from the tail of the
+# distribution.
+def decision_deadline(session):
+    return session.config.get("decision_timeout_seconds") or None
+
+
+def decision_timeout_seconds(player: Player):
+    """get_timeout_seconds of the buyer's decision"""
+    if is_dropout(player.participant):
+        return C.STAND_IN_TIMEOUT_SECONDS
+    return decision_deadline(player.session) or round_timeout_seconds(player)
+
+
+def missed_deadline(player: Player, timeout_happened):
+    """True if the buyer's decision page timed out because of the decision deadline"""
+    return bool(
+        timeout_happened
+        and decision_deadline(player.session)
+        and not is_dropout(player.participant)
+    )
+
+
+def record_decision_time(player: Player, timed_out):
+    """Store how long the buyer took (stand-in decisions are not counted)"""
+    group = player.group
+    group.decision_timed_out = timed_out
+    started = player.participant._last_page_timestamp
+    if started is None or is_dropout(player.participant):
+        return
+    group.decision_seconds = time.time() - started
+    metrics.decision_seconds.observe((str(timed_out).lower(),), group.decision_seconds)
+
+
+# ARRIVAL MATCHING
+# With the arrival_matching session config, creating_session fixes no pairs. Every round
+# starts on ArrivalWaitPage (group_by_arrival_time), which pairs a buyer and a seller
+# of the same cohort from whoever is waiting there, so nobody waits for a late
+# partner. Roles still come from the design: a participant buys in the rounds where
+# their role group buys (role_schedule), so every block keeps its 3 buyer and 3 seller
+# rounds per participant, and every group plays the treatment of its buyer's
+# treatment_order. The utility and cost of a group are drawn from the session seed
+# for its buyer and round, so they do not depend on who arrived first.
+# Among the possible pairs, partners who have met least often come first, then those
+# who have waited longest (and pairs of two active participants before any other); nobody is kept waiting for a better partner, so pairs can
+# repeat. Dropouts are paired with each other; an active participant is paired with a
+# stand-in only once no active partner can still arrive in this round, or after
+# C.ARRIVAL_PATIENCE_SECONDS (in case one never comes). oTree
+# tries to form a group whenever a participant loads the page, and the page reloads
+# itself every 10 to 70 seconds.
+def arrival_matching(session):
+    return bool(session.config.get("arrival_matching"))
+
+
+def planned_role(player: Player):
+    """C.BUYER_ROLE or C.SELLER_ROLE for this round, from role_schedule and role_group"""
+    participant = player.participant
+    buyers = role_schedule(player.session, cohort(participant))[player.round_number - 1]
+    return C.BUYER_ROLE if buyers == role_group(participant) else C.SELLER_ROLE
+
+
+def times_met(buyer: Player, seller: Player):
+    return _read_field(buyer.participant, 'partners', []).count(seller.participant.id_in_session)
+
+
+def group_by_arrival_time_method(subsession: Subsession, waiting_players):
+    """[buyer, seller] for the next group, or None to keep everyone waiting"""
+    if not waiting_players:
+        return None
+    now = time.time()
+    page_index = waiting_players[0].participant._index_in_pages
+    # stand-ins have no browser, so oTree does not count dropouts as waiting
+    others = subsession.player_set.join(Participant).filter(
+        Participant._index_in_pages == page_index,
+        Participant._gbat_grouped == False,
+        Player.id.notin_([p.id for p in waiting_players]),
+    )
+    dropouts = [p for p in others if is_dropout(p.participant)]
+    buyers, sellers = [], []
+    for p in waiting_players + dropouts:
+        (buyers if planned_role(p) == C.BUYER_ROLE else sellers).append(p)
+    if not (buyers and sellers):
+        return None
+
+    to_come = set()  # (cohort, role) of the active participants not on this page yet
+    if any(is_dropout(p.participant) for p in buyers + sellers):
+        to_come = {
+            (cohort(p.participant), planned_role(p))
+            for p in subsession.player_set.join(Participant).filter(
+                Participant._index_in_pages < page_index
+            )
+            if not is_dropout(p.participant)
+        }
+
+    def arrived(p):
+        return p.participant._last_page_timestamp or now
+
+    def can_pair(buyer, seller):
+        if cohort(buyer.participant) != cohort(seller.participant):
+            return False
+        if is_dropout(buyer.participant) == is_dropout(seller.participant):
+            return True
+        active, stand_in = (seller, buyer) if is_dropout(buyer.participant) else (buyer, seller)
+        return (
+            now - arrived(active) >= C.ARRIVAL_PATIENCE_SECONDS
+            or (cohort(stand_in.participant), planned_role(stand_in)) not in to_come
         )
 
-    def comp_check_failed(self):
-        """Check if comprehension questions were answered correctly"""
-        return self.comp_q1 is not False or self.comp_q2 is not False
+    def preference(pair):
+        buyer, seller = pair
+        mixed = is_dropout(buyer.participant) != is_dropout(seller.participant)
+        return mixed, times_met(buyer, seller), min(arrived(buyer), arrived(seller))
 
+    pairs = [(buyer, seller) for buyer in buyers for seller in sellers if can_pair(buyer, seller)]
+    if pairs:
+        # buyer first: id_in_group 1 is C.BUYER_ROLE
+        return list(min(pairs, key=preference))
 
-# PAGES
-class Introduction(Page):
-    @staticmethod
-    def is_displayed(player: Player):
-        return player.round_number == 1
-
-
-class ConsentForm(Page):
-    form_model = "player"
-    form_fields = [
-        "consent_1",
-        "consent_2",
-        "consent_3",
-        "consent_4",
-        "consent_5",
-        "consent_6",
-        "consent_7",
-        "consent_8",
-        "consent_9",
-        "consent_10",
-        "consent_final",
-    ]
 
-    @staticmethod
-    def is_displayed(player: Player):
-        return player.round_number == 1
+def start_arrival_round(group: Group):
+    """Set the new group's cohort, treatment, utility, cost and suggested price"""
+    buyer, seller = group.buyer, group.seller
+    round_number = group.round_number
+    rng = session_rng(group.session, "pair", round_number, buyer.participant.id_in_session)
+    group.cohort = cohort(buyer.participant)
+    group.treatment = treatment_order(buyer.participant)[round_number - 1]
+    group.production_cost = rng.randint(C.COST_MIN, C.COST_MAX)
+    group.product_utility = rng.randint(C.UTILITY_MIN, C.UTILITY_MAX)
+    group.suggested_price = design.suggested_price_for(C, group.treatment, group.production_cost)
+    for player, partner in ((buyer, seller), (seller, buyer)):
+        player.participant.vars.setdefault('partners', []).append(partner.participant.id_in_session)
 
-    @staticmethod
-    def vars_for_template(player: Player):
-        import datetime
-        return dict(date_today=datetime.date.today().strftime("%Y-%m-%d"))
-
-
-class ComprehensionCheck(Page):
-    form_model = "player"
-    form_fields = [
-        "comp_q1",
-        "comp_q2",
-        "comp_q3",
-        "comp_q4",
-        "comp_q5",
-        "comp_q6",
-        "comp_q7",
-    ]
+
+# PAGES
+class ArrivalWaitPage(WaitPage):
+    group_by_arrival_time = True
+    body_text = "You will be matched with another participant as soon as one is ready."
 
     @staticmethod
     def is_displayed(player: Player):
-        return player.round_number == 1
+        return arrival_matching(player.session)
 
     @staticmethod
-    def error_message(player: Player, values):
-        """Validate comprehension check answers and show error with link to instructions if incorrect"""
-        solutions = dict(
-            comp_q1=False,
-            comp_q2=False,
-            comp_q3="a",
-            comp_q4="c",
-            comp_q5=False,
-            comp_q6="c",
-            comp_q7=True,
-        )
-
-        num_wrong = 0
-        for key, answer in solutions.items():
-            if values[key] != answer:
-                num_wrong += 1
-
-        if num_wrong > 0:
-            return (
-                f"You have {num_wrong} incorrect answer(s). "
-                'Please <a href="#" id="showInstructionsLink">review the instructions</a> and try again.'
-                "<script>setTimeout(function(){var l=document.getElementById('showInstructionsLink');if(l){l.onclick=function(e){e.preventDefault();var c=document.getElementById('instructionsCollapse');if(c){c.classList.add('show');c.scrollIntoView({behavior:'smooth'});}}}},0);</script>"
-            )
+    def after_all_players_arrive(group: Group):
+        start_arrival_round(group)
 
 
 class Decision(Page):
     @staticmethod
     def is_displayed(player: Player):
-        return player.role() == C.BUYER_ROLE
+        return player.role() == C.BUYER_ROLE and not live_round(player.session)
 
     form_model = "group"
 
@@ -570,14 +812,23 @@ class Decision(Page):
     @staticmethod
     def error_message(player: Player, values):
         """Validate that price is provided if buyer chooses to buy"""
-        if values["buyer_decision"] and values["price_paid"] is None:
-            return "Please enter how many tokens you want to transfer to the seller."
+        return missing_price_error(values["buyer_decision"], values["price_paid"])
+
+    @staticmethod
+    def get_timeout_seconds(player: Player):
+        return decision_timeout_seconds(player)
 
     @staticmethod
     def before_next_page(player: Player, timeout_happened):
         """Set price to 0 if buyer chose not to buy"""
+        timed_out = missed_deadline(player, timeout_happened)
+        if timeout_happened:
+            # neither the stand-in buyer nor a buyer past the deadline buys
+            player.group.buyer_decision = False
         if not player.group.buyer_decision:
             player.group.price_paid = 0
+        record_decision_time(player, timed_out)
+        after_round_page(player, timeout_happened and not timed_out)
 
     @staticmethod
     def vars_for_template(player: Player):
@@ -587,13 +838,14 @@ class Decision(Page):
             production_cost=player.group.production_cost,
             treatment=player.group.treatment,
             suggested_price=player.group.field_maybe_none("suggested_price"),
+            missing_price_message=MISSING_PRICE_MESSAGE,
         )
 
 
 class SellerInfo(Page):
     @staticmethod
     def is_displayed(player: Player):
-        return player.role() == C.SELLER_ROLE
+        return player.role() == C.SELLER_ROLE and not live_round(player.session)
 
     @staticmethod
     def vars_for_template(player: Player):
@@ -601,167 +853,169 @@ class SellerInfo(Page):
             endowment=C.SELLER_ENDOWMENT, production_cost=player.group.production_cost
         )
 
+    @staticmethod
+    def get_timeout_seconds(player: Player):
+        return round_timeout_seconds(player)
+
+    @staticmethod
+    def before_next_page(player: Player, timeout_happened):
+        after_round_page(player, timeout_happened)
+
 
 class WaitForBuyer(WaitPage):
     @staticmethod
     def is_displayed(player: Player):
-        return player.role() == C.SELLER_ROLE
+        return player.role() == C.SELLER_ROLE and not live_round(player.session)
 
 
 class ResultsWaitPage(WaitPage):
+    @staticmethod
+    def is_displayed(player: Player):
+        return not live_round(player.session)
+
     @staticmethod
     def after_all_players_arrive(group: Group):
-        group.set_payoffs()
+        finish_round(group)
 
 
-class Results(Page):
-    @staticmethod
-    def vars_for_template(player: Player):
-        buyer = [p for p in player.group.get_players() if p.role() == C.BUYER_ROLE][0]
-        seller = [p for p in player.group.get_players() if p.role() == C.SELLER_ROLE][0]
+class Market(Page):
+    """
+    Single-page round (live_round session config): buyer and seller stay on this
+    page, the buyer's decision goes through live_method and the result is pushed
+    to both players at once, replacing Decision → SellerInfo → WaitForBuyer →
+    ResultsWaitPage → Results.
+    """
 
-        # Handle None price_paid when buyer doesn't buy
-        price_paid = player.group.field_maybe_none("price_paid") or 0
+    @staticmethod
+    def is_displayed(player: Player):
+        return live_round(player.session)
 
+    @staticmethod
+    def vars_for_template(player: Player):
+        is_buyer = player.role() == C.BUYER_ROLE
         return dict(
-            is_buyer=player.role() == C.BUYER_ROLE,
-            buyer_decision=player.group.buyer_decision,
-            price_paid=price_paid,
+            is_buyer=is_buyer,
+            endowment=C.BUYER_ENDOWMENT if is_buyer else C.SELLER_ENDOWMENT,
             utility=player.group.product_utility,
             production_cost=player.group.production_cost,
-            buyer_payoff=buyer.potential_payoff,
-            seller_payoff=seller.potential_payoff,
-            endowment=(
-                C.BUYER_ENDOWMENT
-                if player.role() == C.BUYER_ROLE
-                else C.SELLER_ENDOWMENT
-            ),
+            suggested_price=player.group.field_maybe_none("suggested_price"),
         )
 
-
-class Questionnaire(Page):
-    form_model = "player"
-    form_fields = [
-        "q_fair_price",
-        "q_felt_good",
-        "q_fair_to_seller",
-        "q_guilty_low_price",
-        "q_reward_seller",
-        "q_obligated_fair",
-        "q_suggested_influenced",
-        "q_suggested_guide",
-        "q_suggested_quality",
-        "dem_sex",
-        "dem_age",
-        "dem_employment",
-        "dem_income",
-        "dem_familiar",
-        "dem_strategy_name",
-    ]
-
     @staticmethod
-    def is_displayed(player: Player):
-        return player.round_number == C.NUM_ROUNDS
+    def js_vars(player: Player):
+        return dict(
+            is_buyer=player.role() == C.BUYER_ROLE,
+            max_price=C.BUYER_ENDOWMENT,
+            missing_price_message=MISSING_PRICE_MESSAGE,
+        )
 
     @staticmethod
-    def vars_for_template(player: Player):
-        # Randomize the order of Part 1 questions
-        q_field_names = [
-            "q_fair_price",
-            "q_felt_good",
-            "q_fair_to_seller",
-            "q_guilty_low_price",
-            "q_reward_seller",
-            "q_obligated_fair",
-            "q_suggested_influenced",
-            "q_suggested_guide",
-            "q_suggested_quality",
-        ]
-        random.shuffle(q_field_names)
-
-        labels = {
-            "q_fair_price": "My price paid for the product was fair toward the seller.",
-            "q_felt_good": "I felt good about the price I paid.",
-            "q_fair_to_seller": "I paid a higher price because I wanted to be fair to the seller.",
-            "q_guilty_low_price": "Paying a low price would have made me feel guilty.",
-            "q_reward_seller": "I paid a higher amount to reward the seller for their generosity.",
-            "q_obligated_fair": "I felt obligated to pay a fair price because the seller trusted me.",
-            "q_suggested_influenced": "The suggested price influenced the amount I decided to pay.",
-            "q_suggested_guide": "I used the suggested price as a guide for what was appropriate to pay.",
-            "q_suggested_quality": "I believe the suggested price reflects the true quality of the product.",
-        }
+    def get_timeout_seconds(player: Player):
+        if player.role() == C.BUYER_ROLE:
+            return decision_timeout_seconds(player)
+        timeout_seconds = round_timeout_seconds(player)
+        if timeout_seconds and not is_dropout(player.participant):
+            # the seller first waits for the buyer's decision
+            timeout_seconds += decision_deadline(player.session) or timeout_seconds
+        return timeout_seconds
 
-        q_fields = []
-        for name in q_field_names:
-            q_fields.append(dict(name=name, label=labels[name]))
-
-        return dict(q_fields=q_fields)
+    @staticmethod
+    def before_next_page(player: Player, timeout_happened):
+        group = player.group
+        is_buyer = player.role() == C.BUYER_ROLE
+        if group.field_maybe_none("buyer_decision") is None:
+            if not is_buyer:
+                # left while waiting for the buyer, which does not make a dropout;
+                # finish_round records this round once the buyer has decided
+                player.auto_played = timeout_happened
+                return
+            # timeout before deciding: the stand-in buyer (or the buyer past the
+            # deadline) does not buy
+            group.buyer_decision = False
+            group.price_paid = 0
+            record_decision_time(player, missed_deadline(player, timeout_happened))
+            finish_round(group)
+        if is_buyer and missed_deadline(player, timeout_happened):
+            # the deadline also ends the page once the buyer has decided
+            timeout_happened = False
+        after_round_page(player, timeout_happened)
 
+    @staticmethod
+    def live_method(player: Player, data):
+        group = player.group
+        if group.field_maybe_none("buyer_decision") is not None:
+            # already decided: (re)send the result, e.g. after a page reload
+            return {player.id_in_group: round_result(group)}
+        if data.get("type") != "decision" or player.role() != C.BUYER_ROLE:
+            return
+
+        # same rules as the Decision form: 0..BUYER_ENDOWMENT, price required when buying
+        buyer_decision = bool(data.get("buyer_decision"))
+        price_paid = data.get("price_paid")
+        error = None
+        if price_paid is not None:
+            if not isinstance(price_paid, int) or isinstance(price_paid, bool):
+                error = "Please enter a whole number of tokens."
+            elif not 0 <= price_paid <= C.BUYER_ENDOWMENT:
+                error = f"Please enter a number between 0 and {C.BUYER_ENDOWMENT}."
+        error = error or missing_price_error(buyer_decision, price_paid)
+        if error:
+            return {player.id_in_group: dict(type="error", message=error)}
+
+        group.buyer_decision = buyer_decision
+        group.price_paid = price_paid if buyer_decision else 0
+        record_decision_time(player, False)
+        finish_round(group)
+        return {0: round_result(group)}
 
-class ThankYou(Page):
-    form_model = "player"
-    # form_fields = ["bank_name", "account_number", "account_holder_name"]
 
+class Results(Page):
     @staticmethod
     def is_displayed(player: Player):
-        return player.round_number == C.NUM_ROUNDS
+        return not live_round(player.session)
 
     @staticmethod
-    def vars_for_template(player: Player):
-        # Retrieve the common paying round selected in creating_session
-        selected_round_number = player.session.vars['paying_round']
+    def get_timeout_seconds(player: Player):
+        return round_timeout_seconds(player)
 
-        # Get the player object for that specific round
-        selected_round = player.in_round(selected_round_number)
-
-        payoff_selected_round = selected_round.payoff or 0
-
-        # Ensure payoff is not negative for total calculation if that's the rule,
-        # but usually negative payoff is deducted from show-up fee.
-        # The prompt implies: "Including Show-up Fee plus Payoff from Selected Round"
-
-        total_tokens = C.SHOW_UP_FEE + payoff_selected_round
-
-        # Ensure total payment is not negative
-        if total_tokens < 0:
-            total_tokens = 0
+    @staticmethod
+    def before_next_page(player: Player, timeout_happened):
+        after_round_page(player, timeout_happened)
 
-        total_payment_vnd = total_tokens * C.CONVERSION_RATE
+    @staticmethod
+    def vars_for_template(player: Player):
+        buyer = player.group.buyer
+        seller = player.group.seller
 
-        # Fetch history for the table
-        history = []
-        for p in player.in_all_rounds():
-            history.append(
-                dict(
-                    round_number=p.round_number,
-                    role=p.role(),
-                    payoff=int(p.potential_payoff),
-                    is_selected=(p.round_number == selected_round_number),
-                )
-            )
+        # Handle None price_paid when buyer doesn't buy
+        price_paid = player.group.field_maybe_none("price_paid") or 0
+        is_buyer = player.role() == C.BUYER_ROLE
 
         return dict(
-            participant_id=player.participant.code,
-            selected_round_number=selected_round.round_number,
-            payoff_selected_round=payoff_selected_round,
-            show_up_fee=C.SHOW_UP_FEE,
-            show_up_fee_vnd=f"{C.SHOW_UP_FEE * C.CONVERSION_RATE:,.0f}",
-            earnings_from_round_vnd=f"{payoff_selected_round * C.CONVERSION_RATE:,.0f}",
-            total_tokens=total_tokens,
-            total_payment_vnd=f"{total_payment_vnd:,.0f}",
-            history=history,
+            is_buyer=is_buyer,
+            buyer_decision=player.group.buyer_decision,
+            price_paid=price_paid,
+            utility=player.group.product_utility,
+            production_cost=player.group.production_cost,
+            buyer_payoff=buyer.potential_payoff,
+            seller_payoff=seller.potential_payoff,
+            endowment=C.BUYER_ENDOWMENT if is_buyer else C.SELLER_ENDOWMENT,
+            history=(
+                ledger_history(player.participant)
+                if player.session.config.get("show_round_history")
+                else None
+            ),
         )
 
 
 page_sequence = [
-    ConsentForm,
-    Introduction,
-    ComprehensionCheck,
+    ArrivalWaitPage,  # group_by_arrival_time: must stay first
     Decision,
     SellerInfo,
     WaitForBuyer,
     ResultsWaitPage,
     Results,
-    Questionnaire,
-    ThankYou,
+    Market,
 ]
+metrics.instrument_pages(page_sequence)
+profiling.instrument_app(__name__)  # only with PWYW_PROFILE set
@@ -0,0 +1,441 @@
+"""
+Offline analysis of exported sessions: treatment effects on buying and prices.
+
+Loads the long-format market export (the my_game custom export, or
+python -m my_game.export) or oTree's wide "All apps" export into columnar
+NumPy arrays, one entry per player-round, and computes everything with
+grouped array operations, so pooling dozens of sessions takes well under a
+second:
+
+- summarize: buy rate, mean and median price paid, price / production cost and
+  price / suggested price, by any of treatment, role_sequence, round_number,
+  cohort and session
+- fixed_effects: within-buyer (participant fixed effects) estimates of the
+  high_suggested and low_suggested effects relative to control (for
+  price_to_suggested, which control lacks: high_suggested relative to
+  low_suggested, see comparison)
+- bootstrap: percentile confidence intervals for those effects and for the
+  differences in means, resampling participants (or sessions) as clusters
+
+Decisions are the buyers' rows (one per group and round). role_sequence is the
+buyer's role in the previous round followed by the current one: "BB" (buyer
+twice in a row), "SB" (seller before) or "-B" (round 1).
+
+Usage (from the myexperiment folder):
+    python -m my_game.analysis pwyw_long.csv
+    python -m my_game.analysis exports/*.csv --by treatment role_sequence --draws 5000
+"""
+import csv
+
+import numpy as np
+
+from . import C
+
+ROLES = (C.BUYER_ROLE, C.SELLER_ROLE)
+BUYER = ROLES.index(C.BUYER_ROLE)
+CONTROL = C.TREATMENTS.index(C.CONTROL)
+HIGH_SUGGESTED = C.TREATMENTS.index(C.HIGH_SUGGESTED)
+LOW_SUGGESTED = C.TREATMENTS.index(C.LOW_SUGGESTED)
+
+# long-format columns (EXPORT_HEADER) and how they are stored
+TEXT_COLUMNS = ["session", "participant"]
+INT_COLUMNS = ["round_number", "cohort", "product_utility", "production_cost"]
+# float, NaN when empty (booleans as 1.0 / 0.0)
+FLOAT_COLUMNS = [
+    "suggested_price",
+    "buyer_decision",
+    "price_paid",
+    "potential_payoff",
+    "auto_played",
+    "decision_seconds",
+    "decision_timed_out",
+]
+
+# wide export: my_game.<round>.<model>.<field>
+WIDE_FIELDS = dict(
+    role="player.role",
+    cohort="group.cohort",
+    treatment="group.treatment",
+    product_utility="group.product_utility",
+    production_cost="group.production_cost",
+    suggested_price="group.suggested_price",
+    buyer_decision="group.buyer_decision",
+    price_paid="group.price_paid",
+    potential_payoff="player.potential_payoff",
+    auto_played="player.auto_played",
+    decision_seconds="group.decision_seconds",
+    decision_timed_out="group.decision_timed_out",
+)
+
+OUTCOMES = ["buy", "price_paid", "price_to_cost", "price_to_suggested"]
+
+
+# LOADING
+def _floats(values):
+    values = np.asarray(values, dtype=object)
+    values[(values == "") | (values == None)] = np.nan  # noqa: E711 (elementwise)
+    values[values == "True"] = 1
+    values[values == "False"] = 0
+    return values.astype(float)
+
+
+def _codes(values, labels):
+    """Index of each value in labels, -1 if missing"""
+    values = np.asarray(values, dtype=object).astype(str)
+    codes = np.full(len(values), -1)
+    for code, label in enumerate(labels):
+        codes[values == label] = code
+    return codes
+
+
+def _columns(table):
+    """{column name: raw values} -> typed arrays"""
+    data = {name: np.asarray(table[name], dtype=object).astype(str) for name in TEXT_COLUMNS}
+    for name in INT_COLUMNS:
+        values = _floats(table[name]) if name in table else np.full(len(data["session"]), np.nan)
+        if name == "cohort":
+            values[np.isnan(values)] = 1  # exports from before cohorts
+        data[name] = values.astype(int)
+    for name in FLOAT_COLUMNS:
+        data[name] = (
+            _floats(table[name]) if name in table else np.full(len(data["session"]), np.nan)
+        )
+    data["role"] = _codes(table["role"], ROLES)
+    data["treatment"] = _codes(table["treatment"], C.TREATMENTS)
+    return data
+
+
+def _read_csv(source):
+    if isinstance(source, str):
+        with open(source, newline="", encoding="utf-8-sig") as fp:
+            return list(csv.reader(fp))
+    return [list(row) for row in source]
+
+
+def _long_table(rows):
+    header, body = rows[0], rows[1:]
+    columns = list(zip(*body)) if body else [()] * len(header)
+    return dict(zip(header, columns))
+
+
+def _wide_table(rows, app_name="my_game"):
+    """Reshape the wide export (one row per participant) into long-format columns"""
+    header, body = rows[0], np.array(rows[1:], dtype=object).reshape(-1, len(rows[0]))
+    index = {name: i for i, name in enumerate(header)}
+    rounds = sorted(
+        {int(name.split(".")[1]) for name in header if name.startswith(f"{app_name}.")}
+    )
+    num_participants = len(body)
+    table = dict(
+        session=np.repeat(body[:, index["session.code"]], len(rounds)),
+        participant=np.repeat(body[:, index["participant.code"]], len(rounds)),
+        round_number=np.tile(rounds, num_participants),
+    )
+    for name, field in WIDE_FIELDS.items():
+        columns = [index.get(f"{app_name}.{r}.{field}") for r in rounds]
+        if None in columns:
+            continue
+        table[name] = body[:, columns].reshape(-1)
+    # participants who never reached the game have no role
+    played = np.asarray(table["role"], dtype=object) != ""
+    return {name: np.asarray(values, dtype=object)[played] for name, values in table.items()}
+
+
+def load(*sources):
+    """
+    Load and pool exports: CSV paths, or lists of rows with the header first.
+    Long format and wide format are told apart by the header.
+    """
+    tables = []
+    for source in sources:
+        rows = _read_csv(source)
+        wide = "participant.code" in rows[0]
+        tables.append(_columns(_wide_table(rows) if wide else _long_table(rows)))
+    data = {name: np.concatenate([t[name] for t in tables]) for name in tables[0]}
+    return _add_derived(data)
+
+
+def _add_derived(data):
+    # the same participant code could appear in two databases
+    keys = np.char.add(np.char.add(data["session"], "/"), data["participant"])
+    _, data["participant_index"] = np.unique(keys, return_inverse=True)
+    _, data["session_index"] = np.unique(data["session"], return_inverse=True)
+
+    # role in the previous round: sort by participant and round, compare neighbours
+    order = np.lexsort((data["round_number"], data["participant_index"]))
+    previous = np.full(len(order), -1)
+    same = (data["participant_index"][order][1:] == data["participant_index"][order][:-1]) & (
+        data["round_number"][order][1:] == data["round_number"][order][:-1] + 1
+    )
+    previous[order[1:][same]] = data["role"][order[:-1][same]]
+    letters = np.array(["-", "B", "S"])  # -1, BUYER, SELLER
+    data["role_sequence"] = np.char.add(letters[previous + 1], letters[data["role"] + 1])
+    return data
+
+
+def decisions(data):
+    """The buyers' rows (one per group and round), with the outcome columns"""
+    rows = (data["role"] == BUYER) & ~np.isnan(data["buyer_decision"])
+    out = {name: values[rows] for name, values in data.items()}
+    bought = out["buyer_decision"] == 1
+    price = np.where(bought, out["price_paid"], np.nan)
+    suggested = np.where(out["suggested_price"] > 0, out["suggested_price"], np.nan)
+    out["buy"] = out["buyer_decision"]
+    out["price_paid"] = price  # purchases only
+    out["price_to_cost"] = price / out["production_cost"]
+    out["price_to_suggested"] = price / suggested
+    return out
+
+
+# SUMMARIES
+def _group_index(data, by):
+    """(index of each row's cell, list of the cells' key tuples)"""
+    codes = []
+    labels = []
+    for name in by:
+        values = data[name]
+        if name == "treatment":
+            values = np.array(C.TREATMENTS + ("",))[values]
+        uniques, inverse = np.unique(values, return_inverse=True)
+        codes.append(inverse)
+        labels.append(uniques)
+    cells, index = np.unique(np.stack(codes), axis=1, return_inverse=True)
+    keys = [tuple(labels[k][cells[k, j]].item() for k in range(len(by))) for j in range(cells.shape[1])]
+    return index.reshape(-1), keys
+
+
+def _grouped_mean(values, index, num_cells):
+    valid = ~np.isnan(values)
+    n = np.bincount(index[valid], minlength=num_cells)
+    total = np.bincount(index[valid], weights=values[valid], minlength=num_cells)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return total / n, n
+
+
+def _grouped_median(values, index, num_cells):
+    valid = ~np.isnan(values)
+    values, index = values[valid], index[valid]
+    order = np.lexsort((values, index))
+    values, index = values[order], index[order]
+    n = np.bincount(index, minlength=num_cells)
+    start = np.concatenate(([0], np.cumsum(n)[:-1]))
+    lower = start + (n - 1) // 2
+    upper = start + n // 2
+    median = np.full(num_cells, np.nan)
+    has = n > 0
+    median[has] = (values[lower[has]] + values[upper[has]]) / 2
+    return median
+
+
+def summarize(data, by=("treatment",)):
+    """One dict per cell of the by columns, sorted by key"""
+    rows = decisions(data)
+    index, keys = _group_index(rows, by)
+    num_cells = len(keys)
+    n = np.bincount(index, minlength=num_cells)
+    buy_rate, _ = _grouped_mean(rows["buy"], index, num_cells)
+    mean_price, purchases = _grouped_mean(rows["price_paid"], index, num_cells)
+    median_price = _grouped_median(rows["price_paid"], index, num_cells)
+    to_cost, _ = _grouped_mean(rows["price_to_cost"], index, num_cells)
+    to_suggested, _ = _grouped_mean(rows["price_to_suggested"], index, num_cells)
+    return [
+        dict(
+            zip(by, key),
+            n=int(n[j]),
+            purchases=int(purchases[j]),
+            buy_rate=float(buy_rate[j]),
+            mean_price=float(mean_price[j]),
+            median_price=float(median_price[j]),
+            price_to_cost=float(to_cost[j]),
+            price_to_suggested=float(to_suggested[j]),
+        )
+        for j, key in enumerate(keys)
+    ]
+
+
+# TREATMENT EFFECTS
+def comparison(outcome):
+    """(baseline treatment, treatments whose effect is estimated), as C.TREATMENTS indices"""
+    if outcome == "price_to_suggested":
+        # NaN in control (no suggested price): high vs low suggested price
+        return LOW_SUGGESTED, [HIGH_SUGGESTED]
+    return CONTROL, [code for code in range(len(C.TREATMENTS)) if code != CONTROL]
+
+
+def _design_matrix(rows, outcome):
+    """Dummies of the treatments compared with the outcome's baseline, in C.TREATMENTS order"""
+    _, others = comparison(outcome)
+    return np.stack([rows["treatment"] == code for code in others], axis=1).astype(float), [
+        C.TREATMENTS[code] for code in others
+    ]
+
+
+def _cluster_index(rows, cluster):
+    return rows[f"{cluster}_index"]
+
+
+def _within_moments(rows, outcome, cluster):
+    """
+    Per-cluster parts of the participant fixed effects regression: the within
+    (demeaned by participant) X'X and X'y, which add up over participants, so
+    every bootstrap draw is one weighted sum
+    """
+    valid = ~np.isnan(rows[outcome])
+    x, names = _design_matrix(rows, outcome)
+    x, y = x[valid], rows[outcome][valid]
+    participant = rows["participant_index"][valid]
+    clusters = _cluster_index(rows, cluster)[valid]
+    num_participants = participant.max() + 1
+    k = x.shape[1]
+
+    n = np.bincount(participant, minlength=num_participants)
+    x_mean = np.stack(
+        [np.bincount(participant, weights=x[:, j], minlength=num_participants) for j in range(k)],
+        axis=1,
+    ) / np.maximum(n, 1)[:, None]
+    y_mean = np.bincount(participant, weights=y, minlength=num_participants) / np.maximum(n, 1)
+    x_within = x - x_mean[participant]
+    y_within = y - y_mean[participant]
+
+    num_clusters = _cluster_index(rows, cluster).max() + 1
+    xx = np.stack(
+        [
+            np.bincount(clusters, weights=x_within[:, i] * x_within[:, j], minlength=num_clusters)
+            for i in range(k)
+            for j in range(k)
+        ],
+        axis=1,
+    ).reshape(num_clusters, k, k)
+    xy = np.stack(
+        [
+            np.bincount(clusters, weights=x_within[:, j] * y_within, minlength=num_clusters)
+            for j in range(k)
+        ],
+        axis=1,
+    )
+    return xx, xy, names
+
+
+def fixed_effects(data, outcome="price_paid", cluster="participant"):
+    """{treatment: effect relative to the baseline (see comparison)} with participant fixed effects"""
+    xx, xy, names = _within_moments(decisions(data), outcome, cluster)
+    beta = np.linalg.solve(xx.sum(axis=0), xy.sum(axis=0))
+    return {name: float(value) for name, value in zip(names, beta)}
+
+
+def _cell_sums(rows, outcome, cluster):
+    """Per cluster and treatment: sum of the outcome and number of observations"""
+    valid = ~np.isnan(rows[outcome])
+    clusters = _cluster_index(rows, cluster)
+    num_clusters = clusters.max() + 1
+    num_treatments = len(C.TREATMENTS)
+    cell = clusters[valid] * num_treatments + rows["treatment"][valid]
+    size = num_clusters * num_treatments
+    total = np.bincount(cell, weights=rows[outcome][valid], minlength=size)
+    count = np.bincount(cell, minlength=size)
+    return total.reshape(num_clusters, -1), count.reshape(num_clusters, -1)
+
+
+def bootstrap(data, outcome="price_paid", num_draws=2000, alpha=0.05, cluster="participant", rng=None):
+    """
+    Estimates and percentile confidence intervals of each treatment's effect
+    relative to the baseline (see comparison): the difference in means and the fixed effects
+    estimate. Clusters (participants or sessions) are resampled with
+    replacement; each draw is a matrix product of resampling counts with
+    per-cluster sums.
+    """
+    rng = np.random.default_rng(rng)
+    rows = decisions(data)
+    baseline, _ = comparison(outcome)
+    num_clusters = _cluster_index(rows, cluster).max() + 1
+    # how often each cluster is drawn, shape (draws, clusters)
+    weights = rng.multinomial(num_clusters, np.full(num_clusters, 1 / num_clusters), num_draws)
+
+    total, count = _cell_sums(rows, outcome, cluster)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = total.sum(axis=0) / count.sum(axis=0)
+        draw_means = (weights @ total) / (weights @ count)
+
+    xx, xy, names = _within_moments(rows, outcome, cluster)
+    k = len(names)
+    beta = np.linalg.solve(xx.sum(axis=0), xy.sum(axis=0))
+    draw_xx = (weights @ xx.reshape(num_clusters, -1)).reshape(num_draws, k, k)
+    draw_xy = weights @ xy
+    # draws without any variation within participants are singular; drop them
+    usable = np.abs(np.linalg.det(draw_xx)) > 1e-9
+    draw_beta = np.linalg.solve(draw_xx[usable], draw_xy[usable][..., None])[..., 0]
+
+    quantiles = [alpha / 2, 1 - alpha / 2]
+    results = []
+    for j, name in enumerate(names):
+        code = C.TREATMENTS.index(name)
+        difference = draw_means[:, code] - draw_means[:, baseline]
+        low, high = np.nanquantile(difference, quantiles)
+        fe_low, fe_high = np.quantile(draw_beta[:, j], quantiles)
+        results.append(
+            dict(
+                treatment=name,
+                baseline=C.TREATMENTS[baseline],
+                difference=float(means[code] - means[baseline]),
+                difference_ci=(float(low), float(high)),
+                fixed_effects=float(beta[j]),
+                fixed_effects_ci=(float(fe_low), float(fe_high)),
+            )
+        )
+    return results
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Treatment effects from exported PWYW data")
+    parser.add_argument("files", nargs="+", help="long-format or wide export CSV files")
+    parser.add_argument(
+        "--by",
+        nargs="+",
+        default=["treatment"],
+        choices=["treatment", "role_sequence", "round_number", "cohort", "session"],
+    )
+    parser.add_argument("--outcome", choices=OUTCOMES, default="price_paid")
+    parser.add_argument("--cluster", choices=["participant", "session"], default="participant")
+    parser.add_argument("--draws", type=int, default=2000)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    data = load(*args.files)
+    num_sessions = len(np.unique(data["session"]))
+    print(f"{len(data['session'])} player-rounds from {num_sessions} session(s)\n")
+
+    def fmt(value, width=8):
+        return f"{'':>{width}}" if np.isnan(value) else f"{value:>{width}.2f}"
+
+    print(
+        "".join(f"{name:>16}" for name in args.by)
+        + f"{'n':>6}{'buy':>8}{'price':>8}{'median':>8}{'/cost':>8}{'/sugg.':>8}"
+    )
+    for row in summarize(data, args.by):
+        print(
+            "".join(f"{str(row[name]):>16}" for name in args.by)
+            + f"{row['n']:>6}"
+            + "".join(
+                fmt(row[name])
+                for name in ("buy_rate", "mean_price", "median_price", "price_to_cost", "price_to_suggested")
+            )
+        )
+
+    baseline, _ = comparison(args.outcome)
+    print(f"\n{args.outcome} vs {C.TREATMENTS[baseline]}, {100 * (1 - 0.05):.0f}% CI ({args.cluster} bootstrap, {args.draws} draws)")
+    for row in bootstrap(data, args.outcome, args.draws, cluster=args.cluster, rng=args.seed):
+        low, high = row["difference_ci"]
+        fe_low, fe_high = row["fixed_effects_ci"]
+        print(
+            f"{row['treatment']:>16}  difference {row['difference']:7.2f} [{low:6.2f}, {high:6.2f}]"
+            f"  fixed effects {row['fixed_effects']:7.2f} [{fe_low:6.2f}, {fe_high:6.2f}]"
+        )
+    print(f"({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Static asset pipeline for the participant pages.
+
+Sources live in _assets/: pwyw.js and pwyw.css (the scripts and styles of all
+pages, one bundle each) and diagram.png. Running
+
+    python my_game/assets.py
+
+(from the myexperiment folder) writes content-hashed copies to _static/pwyw/
+(e.g. pwyw.3f2a9c1b7e.js), WebP versions of the diagram at two widths plus a
+palette PNG fallback, and regenerates the two templates that point to them:
+_templates/global/Page.html (the bundles, on every page) and
+_templates/global/Diagram.html (the responsive diagram). Rerun it after
+editing anything in _assets/ and commit the output.
+
+A file's name changes whenever its content does, so install_cache_headers()
+lets browsers cache everything under /static/pwyw/ for a year without
+revalidating: over 18 rounds each asset is downloaded once.
+"""
+import hashlib
+import os
+import sys
+import warnings
+from io import BytesIO
+from pathlib import Path
+
+SOURCE_DIR = Path("_assets")
+OUTPUT_DIR = Path("_static", "pwyw")
+TEMPLATE_DIR = Path("_templates", "global")
+
+BUNDLES = ["pwyw.css", "pwyw.js"]
+DIAGRAM = "diagram.png"
+DIAGRAM_WIDTHS = [512, 1024]
+DIAGRAM_PNG_COLORS = 64
+
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+PAGE_TEMPLATE = """\
+{{% extends "otree/Page.html" %}}
+{{% load otree static %}}
+{{# Generated by python my_game/assets.py from _assets/. Do not edit. #}}
+
+{{% block global_styles %}}
+<link rel="stylesheet" href="{{% static '{css}' %}}">
+{{% endblock %}}
+
+{{% block global_scripts %}}
+<script src="{{% static '{js}' %}}"></script>
+{{% endblock %}}
+"""
+
+DIAGRAM_TEMPLATE = """\
+{{# Generated by python my_game/assets.py from _assets/. Do not edit. #}}
+<picture>
+  <source type="image/webp" sizes="(max-width: {width}px) 100vw, {width}px"
+          srcset="{srcset}">
+  <img src="{{{{ static '{png}' }}}}" width="{width}" height="{height}" loading="lazy"
+       class="img-fluid d-block mx-auto" alt="Experiment Diagram">
+</picture>
+"""
+
+
+def hashed_name(name, content):
+    """pwyw.js -> pwyw.<first 10 hex digits of the SHA-256 of content>.js"""
+    stem, suffix = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:10]}{suffix}"
+
+
+def _encode(image, **save_kwargs):
+    buffer = BytesIO()
+    image.save(buffer, **save_kwargs)
+    return buffer.getvalue()
+
+
+def diagram_versions(path):
+    """{file name: content} of the resized WebP diagrams and the PNG fallback"""
+    try:
+        from PIL import Image
+    except ImportError:
+        sys.exit("Building the diagram needs Pillow: pip install pillow")
+
+    source = Image.open(path)
+    width, height = source.size
+    versions = {}
+    for target_width in DIAGRAM_WIDTHS:
+        target_width = min(target_width, width)
+        resized = source.resize(
+            (target_width, round(height * target_width / width)), Image.LANCZOS
+        )
+        versions[f"diagram-{target_width}.webp"] = _encode(
+            resized, format="WEBP", quality=80, method=6
+        )
+    # the flat drawing needs only a few colours, so a palette PNG is much smaller
+    palette = source.convert("RGB").quantize(DIAGRAM_PNG_COLORS)
+    versions[f"diagram-{width}.png"] = _encode(palette, format="PNG", optimize=True)
+    return versions, (width, height)
+
+
+def build():
+    """Write the hashed assets and the templates; return {output file: size}"""
+    contents = {name: (SOURCE_DIR / name).read_bytes() for name in BUNDLES}
+    diagrams, (width, height) = diagram_versions(SOURCE_DIR / DIAGRAM)
+    contents.update(diagrams)
+
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    urls = {}
+    for name, content in contents.items():
+        hashed = hashed_name(name, content)
+        (OUTPUT_DIR / hashed).write_bytes(content)
+        urls[name] = f"pwyw/{hashed}"
+    # drop the outputs of earlier builds
+    current = {Path(url).name for url in urls.values()}
+    for path in OUTPUT_DIR.iterdir():
+        if path.name not in current:
+            path.unlink()
+
+    (TEMPLATE_DIR / "Page.html").write_text(
+        PAGE_TEMPLATE.format(css=urls["pwyw.css"], js=urls["pwyw.js"])
+    )
+    webp = [name for name in diagrams if name.endswith(".webp")]
+    srcset = ", ".join(
+        f"{{{{ static '{urls[name]}' }}}} {name.split('-')[1].split('.')[0]}w" for name in webp
+    )
+    png = next(name for name in diagrams if name.endswith(".png"))
+    (TEMPLATE_DIR / "Diagram.html").write_text(
+        DIAGRAM_TEMPLATE.format(srcset=srcset, png=urls[png], width=width, height=height)
+    )
+    return {urls[name]: len(content) for name, content in contents.items()}
+
+
+def install_cache_headers():
+    """Serve the files under /static/pwyw/ with a one-year immutable Cache-Control"""
+    try:
+        from otree.common2 import static_files_app
+
+        file_response = static_files_app.file_response
+    except (ImportError, AttributeError):
+        # another oTree version (requirements.txt pins the tested one): serve the
+        # files with oTree's default headers
+        warnings.warn("pwyw: cannot add cache headers to /static/pwyw/ in this oTree version")
+        return
+    if getattr(static_files_app, "pwyw_cache_headers", False):
+        return
+
+    def file_response_with_cache_headers(full_path, *args, **kwargs):
+        response = file_response(full_path, *args, **kwargs)
+        if Path(full_path).parent.name == OUTPUT_DIR.name:
+            response.headers["Cache-Control"] = CACHE_CONTROL
+        return response
+
+    static_files_app.file_response = file_response_with_cache_headers
+    static_files_app.pwyw_cache_headers = True
+
+
+def main():
+    sizes = build()
+    original = (SOURCE_DIR / DIAGRAM).stat().st_size
+    for url, size in sizes.items():
+        print(f"{url:<40} {size / 1024:>7.1f} KB")
+    print(f"(diagram source: {original / 1024:.1f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Session design engine for the PWYW game.
+
+The whole 18-round schedule is built once, in round 1 of creating_session,
+and stored as compact flat arrays. Every later round only applies its own
+slice of it, so session creation is one linear pass over the participants
+instead of one pass per round.
+
+Matching is perfect-stranger between the role groups: in every round the i-th
+member of Group A meets member (i + shift) % num_pairs of Group B, with a
+different shift each round (see build_partner_shifts), so no pair meets twice
+while there are at least as many pairs as rounds.
+
+Participants are referred to by index (participant.id_in_session - 1), so
+apply_round_design in __init__.py can map a round's pairs to Player rows and
+write them with one bulk update, the buyer first in every pair.
+
+Large sessions can be split into cohorts (build_cohort_design): independent
+matching pools, each with its own role groups, role schedule, paying round and
+matching. A pool's design depends only on its own size and random draws, so
+pools can be built, and later analyzed, separately.
+"""
+from array import array
+import random
+
+GROUP_A = 0
+GROUP_B = 1
+
+# role_schedule values
+# 0 = Group A is Buyer (Group B is Seller)
+# 1 = Group B is Buyer (Group A is Seller)
+A_BUYS = 0
+B_BUYS = 1
+
+# Stored in the suggested array for the control treatment
+NO_SUGGESTED_PRICE = -1
+
+
+def suggested_price_for(C, treatment, production_cost):
+    """Suggested price shown to the buyer, or None in the control treatment"""
+    if treatment == C.LOW_SUGGESTED:
+        return production_cost
+    if treatment == C.HIGH_SUGGESTED:
+        return round(C.HIGH_SUGGESTED_MULTIPLIER * production_cost)
+    return None
+
+
+def build_role_schedule(C, rng=random):
+    """In every block of 6 rounds, exactly 3 are A_BUYS and 3 are B_BUYS"""
+    half = C.ROUNDS_PER_BLOCK // 2
+    role_schedule = []
+    for _ in range(C.NUM_ROUNDS // C.ROUNDS_PER_BLOCK):
+        block = [A_BUYS] * half + [B_BUYS] * half
+        rng.shuffle(block)
+        role_schedule.extend(block)
+    return role_schedule
+
+
+def build_treatment_order(C, rng=random):
+    """A randomized order of treatment codes (indices into C.TREATMENTS)"""
+    per_block = C.ROUNDS_PER_BLOCK // len(C.TREATMENTS)
+    one_block = [code for code in range(len(C.TREATMENTS)) for _ in range(per_block)]
+    order = one_block * (C.NUM_ROUNDS // C.ROUNDS_PER_BLOCK)
+    rng.shuffle(order)
+    return order
+
+
+def build_partner_shifts(num_pairs, num_rounds, rng=random):
+    """
+    One Group B offset per round. Every shift is used once before any is reused,
+    so a pair meets at most ceil(num_rounds / num_pairs) times, never in two
+    consecutive rounds (with 2+ pairs), and never twice if num_pairs >= num_rounds.
+    """
+    shifts = []
+    while len(shifts) < num_rounds:
+        cycle = list(range(num_pairs))
+        rng.shuffle(cycle)
+        if shifts and num_pairs > 1 and cycle[0] == shifts[-1]:
+            cycle[0], cycle[-1] = cycle[-1], cycle[0]
+        shifts.extend(cycle)
+    return shifts[:num_rounds]
+
+
+def build_design(C, num_participants, rng=random):
+    """
+    Build the full session design.
+
+    Returns a dict of plain values and arrays (cheap to pickle into session.vars):
+    - role_group: one byte per participant, GROUP_A or GROUP_B
+    - treatment_order: NUM_ROUNDS treatment codes per participant, flattened
+    - role_schedule: one byte per round, A_BUYS or B_BUYS
+    - paying_round: the common paying round (1-indexed)
+    - buyer, seller: participant index of each pair, flattened as round * num_pairs + pair
+    - treatment, utility, cost, suggested: the same layout, one entry per pair
+    """
+    if num_participants % 2:
+        raise ValueError(
+            "Error: Uneven number of buyers and sellers. Ensure even number of participants."
+        )
+
+    num_rounds = C.NUM_ROUNDS
+    num_pairs = num_participants // 2
+
+    # A. Role Group Assignment (Strict Balance)
+    # Shuffle to randomize who gets into Group A vs B, then first half is A
+    order = list(range(num_participants))
+    rng.shuffle(order)
+    group_a = order[:num_pairs]
+    group_b = order[num_pairs:]
+    role_group = bytearray(num_participants)
+    for idx in group_b:
+        role_group[idx] = GROUP_B
+
+    # B. Treatment Randomization: EACH participant gets their own order
+    treatment_order = bytearray(num_participants * num_rounds)
+    for idx in range(num_participants):
+        start = idx * num_rounds
+        treatment_order[start:start + num_rounds] = bytes(build_treatment_order(C, rng))
+
+    # C. Role Schedule and Common Paying Round
+    role_schedule = build_role_schedule(C, rng)
+    paying_round = rng.randint(1, num_rounds)
+
+    # D. Matching (perfect stranger), utilities and costs for every round
+    shifts = build_partner_shifts(num_pairs, num_rounds, rng)
+    size = num_rounds * num_pairs
+    buyer = array("H", bytes(2 * size))
+    seller = array("H", bytes(2 * size))
+    treatment = bytearray(size)
+    utility = bytearray(size)
+    cost = bytearray(size)
+    suggested = array("h", bytes(2 * size))
+
+    for round_index in range(num_rounds):
+        shift = shifts[round_index]
+        partners = group_b[shift:] + group_b[:shift]
+        if role_schedule[round_index] == A_BUYS:
+            buyers, sellers = group_a, partners
+        else:
+            buyers, sellers = partners, group_a
+
+        offset = round_index * num_pairs
+        for k in range(num_pairs):
+            b = buyers[k]
+            i = offset + k
+            code = treatment_order[b * num_rounds + round_index]
+            c = rng.randint(C.COST_MIN, C.COST_MAX)
+            price = suggested_price_for(C, C.TREATMENTS[code], c)
+
+            buyer[i] = b
+            seller[i] = sellers[k]
+            treatment[i] = code
+            utility[i] = rng.randint(C.UTILITY_MIN, C.UTILITY_MAX)
+            cost[i] = c
+            suggested[i] = NO_SUGGESTED_PRICE if price is None else price
+
+    return dict(
+        num_participants=num_participants,
+        num_pairs=num_pairs,
+        role_group=bytes(role_group),
+        treatment_order=bytes(treatment_order),
+        role_schedule=bytes(role_schedule),
+        paying_round=paying_round,
+        buyer=buyer,
+        seller=seller,
+        treatment=bytes(treatment),
+        utility=bytes(utility),
+        cost=bytes(cost),
+        suggested=suggested,
+    )
+
+
+def cohort_sizes(num_participants, cohort_size=None):
+    """
+    Sizes of the cohorts: as many as there are whole cohort_size pools, with the
+    pairs spread evenly (sizes at most 2 apart). One cohort if cohort_size is
+    None/0 or not smaller than the session.
+    """
+    if not cohort_size or cohort_size >= num_participants:
+        return [num_participants]
+    if cohort_size < 2:
+        raise ValueError("cohort_size must be at least 2 (one buyer and one seller)")
+    num_cohorts = num_participants // cohort_size
+    base, extra = divmod(num_participants // 2, num_cohorts)
+    return [2 * (base + (i < extra)) for i in range(num_cohorts)]
+
+
+def build_cohort_design(C, num_participants, cohort_size=None, rng=random):
+    """
+    Split the participants at random into cohorts (see cohort_sizes) and build
+    one design per cohort with build_design, merged into one design for the
+    session with the same layout, except:
+    - cohort: one entry per participant, the index of their cohort
+    - role_schedule, paying_round: one entry per cohort
+    - within each round, the pairs are ordered cohort by cohort
+    """
+    if num_participants % 2:
+        raise ValueError(
+            "Error: Uneven number of buyers and sellers. Ensure even number of participants."
+        )
+    num_rounds = C.NUM_ROUNDS
+    sizes = cohort_sizes(num_participants, cohort_size)
+    order = list(range(num_participants))
+    if len(sizes) > 1:
+        rng.shuffle(order)
+
+    cohort = array("H", bytes(2 * num_participants))
+    role_group = bytearray(num_participants)
+    treatment_order = bytearray(num_participants * num_rounds)
+    pools = []
+    start = 0
+    for index, size in enumerate(sizes):
+        members = order[start:start + size]
+        start += size
+        pool = build_design(C, size, rng)
+        pools.append((members, pool))
+        for local, idx in enumerate(members):
+            cohort[idx] = index
+            role_group[idx] = pool["role_group"][local]
+            treatment_order[idx * num_rounds:(idx + 1) * num_rounds] = pool["treatment_order"][
+                local * num_rounds:(local + 1) * num_rounds
+            ]
+
+    buyer = array("H")
+    seller = array("H")
+    pair_arrays = dict(
+        treatment=bytearray(), utility=bytearray(), cost=bytearray(), suggested=array("h")
+    )
+    for round_number in range(1, num_rounds + 1):
+        for members, pool in pools:
+            first, last = round_slice(pool, round_number)
+            buyer.extend(members[local] for local in pool["buyer"][first:last])
+            seller.extend(members[local] for local in pool["seller"][first:last])
+            for key, values in pair_arrays.items():
+                values.extend(pool[key][first:last])
+
+    return dict(
+        num_participants=num_participants,
+        num_pairs=num_participants // 2,
+        cohort=cohort,
+        role_group=bytes(role_group),
+        treatment_order=bytes(treatment_order),
+        role_schedule=[pool["role_schedule"] for _, pool in pools],
+        paying_round=[pool["paying_round"] for _, pool in pools],
+        buyer=buyer,
+        seller=seller,
+        treatment=bytes(pair_arrays["treatment"]),
+        utility=bytes(pair_arrays["utility"]),
+        cost=bytes(pair_arrays["cost"]),
+        suggested=pair_arrays["suggested"],
+    )
+
+
+def round_slice(design, round_number):
+    """Slice bounds of the given round (1-indexed) in the per-pair arrays"""
+    start = (round_number - 1) * design["num_pairs"]
+    return start, start + design["num_pairs"]
+
+
+def treatment_order_letters(C, design, idx):
+    """A participant's treatment order as a string, one of C.TREATMENT_LETTERS per round"""
+    num_rounds = C.NUM_ROUNDS
+    start = idx * num_rounds
+    return "".join(
+        C.TREATMENT_LETTERS[code] for code in design["treatment_order"][start:start + num_rounds]
+    )
+
+
+def role_schedule_letters(role_schedule):
+    """The role group that buys in each round ("A" or "B"), as one string"""
+    return "".join("A" if code == A_BUYS else "B" for code in role_schedule)
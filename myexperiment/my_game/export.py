@@ -0,0 +1,91 @@
+"""
+Streaming long-format export of the market data.
+
+Same columns as custom_export, but read straight from the database in
+fixed-size chunks of plain column tuples (keyset pagination on the player id),
+so memory stays flat however many sessions are in the database.
+
+Usage (from the myexperiment folder):
+    python -m my_game.export > pwyw_long.csv
+    python -m my_game.export --session <session code> --output pwyw_long.csv
+"""
+import csv
+import sys
+
+from otree.database import dbq
+from otree.export import sanitize_for_csv
+from otree.models import Participant, Session
+
+from . import EXPORT_HEADER, Group, Player
+
+CHUNK_SIZE = 2000
+
+
+def iter_rows(session_code=None, chunk_size=CHUNK_SIZE):
+    """Yield EXPORT_HEADER, then one tuple per player-round, chunk by chunk"""
+    query = (
+        dbq(Player)
+        .join(Group, Player.group_id == Group.id)
+        .join(Participant, Player.participant_id == Participant.id)
+        .join(Session, Player.session_id == Session.id)
+        .with_entities(
+            Player.id,
+            Session.code,
+            Participant.code,
+            Player.round_number,
+            Group.cohort,
+            Player._role,
+            Group.treatment,
+            Group.product_utility,
+            Group.production_cost,
+            Group.suggested_price,
+            Group.buyer_decision,
+            Group.price_paid,
+            Player.potential_payoff,
+            Player.auto_played,
+            Group.decision_seconds,
+            Group.decision_timed_out,
+        )
+        .order_by(Player.id)
+    )
+    if session_code:
+        query = query.filter(Session.code == session_code)
+
+    yield EXPORT_HEADER
+    last_id = 0
+    while True:
+        chunk = query.filter(Player.id > last_id).limit(chunk_size).all()
+        if not chunk:
+            return
+        for row in chunk:
+            yield row[1:]
+        last_id = chunk[-1][0]
+
+
+def write_csv(fp, session_code=None, chunk_size=CHUNK_SIZE):
+    writer = csv.writer(fp)
+    for row in iter_rows(session_code, chunk_size):
+        writer.writerow([sanitize_for_csv(value) for value in row])
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Stream the long-format market export as CSV")
+    parser.add_argument("--session", help="session code (default: all sessions)")
+    parser.add_argument("--output", help="CSV file (default: stdout)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    from otree.main import setup
+
+    setup()
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf8") as fp:
+            write_csv(fp, args.session, args.chunk_size)
+    else:
+        write_csv(sys.stdout, args.session, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Live server metrics in the Prometheus text exposition format, served at /metrics.
+
+- pwyw_page_callback_seconds: histogram of the time spent in the vars_for_template,
+  before_next_page and after_all_players_arrive of every page class, labelled by
+  app, page and callback. Each app wraps its pages with instrument_pages().
+- pwyw_http_request_seconds: histogram of the time oTree spends on each request
+  (after it got the global lock), to see whether the server is saturated.
+- pwyw_decision_seconds: histogram of how long buyers take to decide (see DECISION
+  TIMEOUTS in __init__.py), to set decision_timeout_seconds from its tail.
+- pwyw_participants_on_page: number of participants whose current page is the
+  given page of the given round, per session. On WaitForBuyer and
+  ResultsWaitPage this is the queue of players waiting for their partner.
+
+The histograms are kept in memory by the web process (prodserver1of2 runs one
+worker) and start again from zero when it restarts; the page counts are read
+from the database at every scrape. install_endpoint() adds the /metrics route;
+if the PWYW_METRICS_TOKEN environment variable is set, a scrape needs the header
+"Authorization: Bearer <token>". Without it, /metrics answers only in DEBUG mode:
+with OTREE_PRODUCTION set it returns 403, since the page counts show the session
+codes and how many participants are on each page.
+"""
+import functools
+import os
+import threading
+import time
+import warnings
+from collections import defaultdict
+
+CALLBACKS = ["vars_for_template", "before_next_page", "after_all_players_arrive"]
+
+# upper bounds in seconds, as in the Prometheus client libraries
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+DECISION_BUCKETS = [5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 300]
+
+PATH = "/metrics"
+TOKEN_VARIABLE = "PWYW_METRICS_TOKEN"
+CONTENT_TYPE = "text/plain; version=0.0.4"  # Starlette adds the charset
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one series per label tuple"""
+
+    def __init__(self, name, help, label_names, buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = defaultdict(lambda: [[0] * len(buckets), 0.0, 0])
+        self._lock = threading.Lock()
+
+    def observe(self, labels, seconds):
+        with self._lock:
+            counts, _, _ = series = self._series[labels]
+            for i, upper in enumerate(self.buckets):
+                if seconds <= upper:
+                    counts[i] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def lines(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = sorted((labels, [list(s[0]), s[1], s[2]]) for labels, s in self._series.items())
+        for labels, (counts, total, count) in series:
+            pairs = list(zip(self.label_names, labels))
+            for upper, bucket_count in zip(self.buckets, counts):
+                yield f"{self.name}_bucket{_labels(pairs + [('le', upper)])} {bucket_count}"
+            yield f"{self.name}_bucket{_labels(pairs + [('le', '+Inf')])} {count}"
+            yield f"{self.name}_sum{_labels(pairs)} {total:.6f}"
+            yield f"{self.name}_count{_labels(pairs)} {count}"
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+page_callback_seconds = Histogram(
+    "pwyw_page_callback_seconds",
+    "Time spent in page callbacks.",
+    ("app", "page", "callback"),
+)
+http_request_seconds = Histogram(
+    "pwyw_http_request_seconds", "Time spent handling HTTP requests.", ()
+)
+decision_seconds = Histogram(
+    "pwyw_decision_seconds",
+    "Time buyers took to decide, including missed deadlines.",
+    ("timed_out",),
+    DECISION_BUCKETS,
+)
+
+
+def _timed(function, labels):
+    @functools.wraps(function)
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            page_callback_seconds.observe(labels, time.perf_counter() - start)
+
+    return timed
+
+
+def instrument_pages(page_sequence):
+    """Time the CALLBACKS that the page classes define themselves"""
+    for page in page_sequence:
+        app_name = page.__module__.split(".")[0]
+        for callback in CALLBACKS:
+            method = page.__dict__.get(callback)
+            if isinstance(method, staticmethod):
+                timed = _timed(method.__func__, (app_name, page.__name__, callback))
+                setattr(page, callback, staticmethod(timed))
+
+
+def participants_on_page():
+    """{(session code, app, page, round): number of participants there now}"""
+    from otree.database import dbq
+    from otree.models import Participant, Session
+    from sqlalchemy import func
+
+    rows = (
+        dbq(Participant)
+        .join(Session, Participant.session_id == Session.id)
+        .filter(Participant._current_page_name.isnot(None))
+        .with_entities(
+            Session.code,
+            Participant._current_app_name,
+            Participant._current_page_name,
+            Participant._round_number,
+            func.count(Participant.id),
+        )
+        .group_by(
+            Session.code,
+            Participant._current_app_name,
+            Participant._current_page_name,
+            Participant._round_number,
+        )
+    )
+    return {tuple(row[:4]): row[4] for row in rows}
+
+
+def exposition():
+    """All metrics as one text exposition document"""
+    lines = [
+        *page_callback_seconds.lines(),
+        *http_request_seconds.lines(),
+        *decision_seconds.lines(),
+    ]
+    name = "pwyw_participants_on_page"
+    lines += [
+        f"# HELP {name} Participants whose current page is this page.",
+        f"# TYPE {name} gauge",
+    ]
+    label_names = ("session", "app", "page", "round")
+    for labels, count in sorted(participants_on_page().items(), key=str):
+        lines.append(f"{name}{_labels(list(zip(label_names, labels)))} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def install_endpoint():
+    """Serve exposition() at PATH and time every request, through oTree's PerfMiddleware"""
+    from otree import settings
+    from starlette.responses import PlainTextResponse, Response
+
+    try:
+        from otree import middleware
+
+        middleware.PerfMiddleware
+    except (ImportError, AttributeError):
+        # a private hook: see the oTree pin in requirements.txt
+        warnings.warn("pwyw: otree.middleware.PerfMiddleware not found, /metrics is not served")
+        return
+
+    if getattr(middleware.PerfMiddleware, "pwyw_metrics", False):
+        return
+
+    class MetricsMiddleware(middleware.PerfMiddleware):
+        pwyw_metrics = True
+
+        async def dispatch(self, request, call_next):
+            if request.url.path != PATH:
+                start = time.perf_counter()
+                response = await super().dispatch(request, call_next)
+                http_request_seconds.observe((), time.perf_counter() - start)
+                return response
+            token = os.environ.get(TOKEN_VARIABLE)
+            if not token and not settings.DEBUG:
+                return Response(status_code=403)
+            if token and request.headers.get("Authorization") != f"Bearer {token}":
+                return Response(status_code=401)
+            return PlainTextResponse(exposition(), media_type=CONTENT_TYPE)
+
+    # read by otree.asgi when it builds the middleware stack, after the apps are imported
+    middleware.PerfMiddleware = MetricsMiddleware
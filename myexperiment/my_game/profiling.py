@@ -0,0 +1,165 @@
+"""
+Opt-in profiling of the app code, per session.
+
+Set the PWYW_PROFILE environment variable before starting the server (or the
+bots) to time every call of creating_session, Group.set_payoffs and the static
+methods of the pages (vars_for_template, before_next_page, is_displayed, ...):
+
+    PWYW_PROFILE=report   per function: calls, wall time and database queries
+    PWYW_PROFILE=cprofile the same report, plus cProfile stats of everything
+                          those functions call
+
+Each session gets _profiles/<session code>.txt (and .prof, which can be opened
+with python -m pstats or snakeviz), rewritten at most every DUMP_INTERVAL_SECONDS
+while it runs and once more when the process exits. PWYW_PROFILE_DIR changes the
+folder. Times and query counts include nested calls: the time of set_payoffs is
+also part of the after_all_players_arrive that calls it.
+
+Without PWYW_PROFILE, instrument_app() returns without touching anything, so
+the app runs its functions unwrapped.
+"""
+import atexit
+import cProfile
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+MODE = os.environ.get("PWYW_PROFILE", "").lower()
+ENABLED = MODE in ("report", "cprofile")
+OUTPUT_DIR = Path(os.environ.get("PWYW_PROFILE_DIR", "_profiles"))
+DUMP_INTERVAL_SECONDS = 10
+
+
+class SessionProfile:
+    def __init__(self):
+        # function name -> [calls, total seconds, max seconds, queries]
+        self.functions = defaultdict(lambda: [0, 0.0, 0.0, 0])
+        self.profiler = cProfile.Profile() if MODE == "cprofile" else None
+        self.last_dump = time.monotonic()
+
+    def add(self, name, seconds, queries):
+        row = self.functions[name]
+        row[0] += 1
+        row[1] += seconds
+        row[2] = max(row[2], seconds)
+        row[3] += queries
+
+    def report(self, session_code):
+        """Text table of the functions, slowest in total first"""
+        lines = [
+            f"session {session_code}",
+            f"{'calls':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9} {'queries':>8} {'q/call':>7}  function",
+        ]
+        rows = sorted(self.functions.items(), key=lambda item: item[1][1], reverse=True)
+        for name, (calls, total, longest, queries) in rows:
+            lines.append(
+                f"{calls:>7} {total * 1e3:>10.1f} {total / calls * 1e3:>9.2f} "
+                f"{longest * 1e3:>9.2f} {queries:>8} {queries / calls:>7.1f}  {name}"
+            )
+        return "\n".join(lines) + "\n"
+
+    def dump(self, session_code):
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        (OUTPUT_DIR / f"{session_code}.txt").write_text(self.report(session_code))
+        if self.profiler:
+            self.profiler.dump_stats(OUTPUT_DIR / f"{session_code}.prof")
+        self.last_dump = time.monotonic()
+
+
+sessions = defaultdict(SessionProfile)
+_lock = threading.Lock()
+_local = threading.local()  # depth: nesting of profiled calls; queries: counter
+
+
+def _count_query(*args):
+    _local.queries = getattr(_local, "queries", 0) + 1
+
+
+def _session_code(args, kwargs):
+    # the first argument is the player, group or subsession (aapa passes it by keyword)
+    model = args[0] if args else next(iter(kwargs.values()))
+    return model.session.code
+
+
+def _profiled(function, name):
+    @functools.wraps(function)
+    def profiled(*args, **kwargs):
+        session_code = _session_code(args, kwargs)
+        depth = getattr(_local, "depth", 0)
+        queries = getattr(_local, "queries", 0)
+        profiler = None
+        if depth == 0 and MODE == "cprofile":
+            # only the outermost call: one cProfile profiler can run at a time
+            profiler = sessions[session_code].profiler
+            profiler.enable()
+        _local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            _local.depth = depth
+            if profiler:
+                profiler.disable()
+            queries = getattr(_local, "queries", 0) - queries
+            with _lock:
+                profile = sessions[session_code]
+                profile.add(name, seconds, queries)
+                if time.monotonic() - profile.last_dump > DUMP_INTERVAL_SECONDS:
+                    profile.dump(session_code)
+
+    return profiled
+
+
+def dump_all():
+    with _lock:
+        for session_code, profile in sessions.items():
+            profile.dump(session_code)
+
+
+_installed = False
+
+
+def _install():
+    global _installed
+    if _installed:
+        return
+    from otree.database import engine
+    from sqlalchemy import event
+
+    event.listen(engine, "before_cursor_execute", _count_query)
+    atexit.register(dump_all)
+    _installed = True
+
+
+def instrument_app(module_name):
+    """
+    Profile the creating_session, Group.set_payoffs and page static methods of an
+    app. Call it at the end of the app's __init__.py with __name__.
+    """
+    if not ENABLED:
+        return
+    _install()
+    module = sys.modules[module_name]
+    if hasattr(module, "creating_session"):
+        module.creating_session = _profiled(
+            module.creating_session, f"{module_name}.creating_session"
+        )
+    if "set_payoffs" in vars(module.Group):
+        module.Group.set_payoffs = _profiled(
+            module.Group.set_payoffs, f"{module_name}.Group.set_payoffs"
+        )
+    for page in module.page_sequence:
+        for attr, method in list(vars(page).items()):
+            if not isinstance(method, staticmethod):
+                continue
+            function = method.__func__
+            if inspect.iscoroutinefunction(function) or inspect.isasyncgenfunction(function):
+                continue
+            name = f"{module_name}.{page.__name__}.{attr}"
+            setattr(page, attr, staticmethod(_profiled(function, name)))
@@ -0,0 +1,251 @@
+"""
+Offline Monte Carlo simulator of the PWYW design, for power analysis.
+
+Generates many synthetic sessions at once as NumPy arrays, following the same
+rules as creating_session and Group.set_payoffs (treatment blocks, balanced
+role schedule, perfect-stranger matching, utility and cost ranges, suggested
+prices, payoff formula, common paying round) and reading every parameter from C.
+
+Treatments are coded as indices into C.TREATMENTS, like in design.py.
+Arrays of pair outcomes have shape (sessions, rounds, pairs).
+
+Usage (from the myexperiment folder):
+    python -m my_game.simulation
+    python -m my_game.simulation --participants 10 20 30 --sessions 1 2 4
+"""
+import numpy as np
+
+from . import C
+from .design import NO_SUGGESTED_PRICE
+
+CONTROL = C.TREATMENTS.index(C.CONTROL)
+HIGH_SUGGESTED = C.TREATMENTS.index(C.HIGH_SUGGESTED)
+LOW_SUGGESTED = C.TREATMENTS.index(C.LOW_SUGGESTED)
+
+
+def _permutations(rng, shape):
+    """Independent random permutations of range(shape[-1]) along the last axis"""
+    return np.argsort(rng.random(shape), axis=-1)
+
+
+def _partner_shifts(rng, num_sessions, num_pairs, num_rounds):
+    """design.build_partner_shifts for many sessions at once, shape (sessions, rounds)"""
+    cycles = []
+    for _ in range(-(-num_rounds // num_pairs)):
+        cycle = _permutations(rng, (num_sessions, num_pairs))
+        if cycles and num_pairs > 1:
+            clash = cycle[:, 0] == cycles[-1][:, -1]
+            cycle[clash, 0], cycle[clash, -1] = cycle[clash, -1], cycle[clash, 0]
+        cycles.append(cycle)
+    return np.concatenate(cycles, axis=1)[:, :num_rounds]
+
+
+def simulate_design(num_sessions, num_participants, rng=None):
+    """Draw the randomized design of many sessions (everything except decisions)"""
+    if num_participants % 2:
+        raise ValueError(
+            "Error: Uneven number of buyers and sellers. Ensure even number of participants."
+        )
+    rng = np.random.default_rng(rng)
+    S, N, R = num_sessions, num_participants, C.NUM_ROUNDS
+    P = N // 2
+    num_blocks = R // C.ROUNDS_PER_BLOCK
+
+    # Role groups: first half of a random permutation is Group A
+    members = _permutations(rng, (S, N))
+    group_a, group_b = members[:, :P], members[:, P:]
+
+    # Role schedule: each block of 6 rounds has 3 rounds where Group A buys
+    half = C.ROUNDS_PER_BLOCK // 2
+    block = np.array([0] * half + [1] * half)
+    b_buys = block[_permutations(rng, (S, num_blocks, C.ROUNDS_PER_BLOCK))].reshape(S, R)
+
+    # Treatment order of each participant: a shuffled balanced sequence
+    per_block = C.ROUNDS_PER_BLOCK // len(C.TREATMENTS)
+    sequence = np.tile(np.repeat(np.arange(len(C.TREATMENTS)), per_block), num_blocks)
+    treatment_order = sequence[_permutations(rng, (S, N, R))]
+
+    # Matching: perfect stranger, Group A member i meets Group B member (i + shift) % P
+    shifts = _partner_shifts(rng, S, P, R)
+    a_order = np.broadcast_to(group_a[:, None, :], (S, R, P))
+    b_order = np.take_along_axis(
+        np.broadcast_to(group_b[:, None, :], (S, R, P)),
+        (np.arange(P) + shifts[:, :, None]) % P,
+        -1,
+    )
+    b_buys_pairs = b_buys[:, :, None].astype(bool)
+    buyer = np.where(b_buys_pairs, b_order, a_order)
+    seller = np.where(b_buys_pairs, a_order, b_order)
+
+    # The treatment of a pair is the buyer's own treatment for that round
+    rounds = np.arange(R)[None, :, None]
+    treatment = treatment_order[np.arange(S)[:, None, None], buyer, rounds]
+
+    utility = rng.integers(C.UTILITY_MIN, C.UTILITY_MAX + 1, size=(S, R, P))
+    cost = rng.integers(C.COST_MIN, C.COST_MAX + 1, size=(S, R, P))
+    # np.rint rounds half to even, like Python's round() in design.suggested_price_for
+    suggested = np.select(
+        [treatment == LOW_SUGGESTED, treatment == HIGH_SUGGESTED],
+        [cost, np.rint(C.HIGH_SUGGESTED_MULTIPLIER * cost).astype(cost.dtype)],
+        NO_SUGGESTED_PRICE,
+    )
+
+    paying_round = rng.integers(1, R + 1, size=S)
+
+    return dict(
+        buyer=buyer,
+        seller=seller,
+        treatment=treatment,
+        utility=utility,
+        cost=cost,
+        suggested=suggested,
+        paying_round=paying_round,
+    )
+
+
+# BUYER BEHAVIOR MODELS
+# A model is called as model(design, rng) and returns (buyer_decision, price_paid),
+# two arrays shaped like design["cost"]. price_paid is 0 when the buyer does not buy.
+
+
+def anchoring_model(buy_rate=0.85, base_share=0.5, anchor_weight=0.3, noise_sd=6.0):
+    """
+    Buyers pay a share of their utility, pulled toward the suggested price when
+    one is shown, plus normal noise; the price is clipped to 0..BUYER_ENDOWMENT.
+    """
+
+    def model(design, rng):
+        utility, suggested = design["utility"], design["suggested"]
+        base = base_share * utility
+        target = np.where(
+            suggested == NO_SUGGESTED_PRICE,
+            base,
+            (1 - anchor_weight) * base + anchor_weight * suggested,
+        )
+        price = np.rint(target + rng.normal(0, noise_sd, size=utility.shape))
+        buy = rng.random(utility.shape) < buy_rate
+        price = np.where(buy, np.clip(price, 0, C.BUYER_ENDOWMENT), 0).astype(int)
+        return buy, price
+
+    return model
+
+
+def selfish_model(buy_rate=1.0):
+    """Buyers take the product and pay nothing (the standard-theory benchmark)"""
+
+    def model(design, rng):
+        buy = rng.random(design["cost"].shape) < buy_rate
+        return buy, np.zeros(design["cost"].shape, dtype=int)
+
+    return model
+
+
+def payoffs(design, buy, price):
+    """(buyer, seller) potential payoffs, as in Group.set_payoffs"""
+    buyer_payoff = np.where(buy, C.BUYER_ENDOWMENT - price + design["utility"], C.BUYER_ENDOWMENT)
+    seller_payoff = np.where(buy, price - design["cost"], 0)
+    return buyer_payoff, seller_payoff
+
+
+def payments(design, buyer_payoff, seller_payoff, num_participants):
+    """
+    Tokens paid to each participant, shape (sessions, participants):
+    SHOW_UP_FEE plus the payoff of the common paying round, floored at 0.
+    """
+    S = buyer_payoff.shape[0]
+    rows = np.arange(S)[:, None]
+    paid_round = design["paying_round"] - 1
+    earned = np.zeros((S, num_participants), dtype=int)
+    earned[rows, design["buyer"][rows[:, 0], paid_round]] = buyer_payoff[rows[:, 0], paid_round]
+    earned[rows, design["seller"][rows[:, 0], paid_round]] = seller_payoff[rows[:, 0], paid_round]
+    return np.maximum(C.SHOW_UP_FEE + earned, 0)
+
+
+def simulate(num_sessions, num_participants, behavior=None, rng=None):
+    """Simulate whole sessions: design, decisions, payoffs and payments"""
+    rng = np.random.default_rng(rng)
+    behavior = behavior or anchoring_model()
+    design = simulate_design(num_sessions, num_participants, rng)
+    buy, price = behavior(design, rng)
+    buyer_payoff, seller_payoff = payoffs(design, buy, price)
+    return dict(
+        design,
+        buyer_decision=buy,
+        price_paid=price,
+        buyer_payoff=buyer_payoff,
+        seller_payoff=seller_payoff,
+        payment_tokens=payments(design, buyer_payoff, seller_payoff, num_participants),
+    )
+
+
+def power(
+    num_sessions,
+    num_participants,
+    behavior=None,
+    treatment=C.HIGH_SUGGESTED,
+    baseline=C.CONTROL,
+    outcome="price_paid",
+    num_studies=1000,
+    alpha=0.05,
+    rng=None,
+):
+    """
+    Share of simulated studies (each of num_sessions sessions) in which a
+    two-sided Welch test on the pair-level outcome detects a difference
+    between treatment and baseline at level alpha.
+
+    The test treats pairs as independent, so with strong participant-level
+    heterogeneity it is optimistic.
+    """
+    from statistics import NormalDist
+
+    sim = simulate(num_studies * num_sessions, num_participants, behavior, rng)
+    y = sim[outcome].reshape(num_studies, -1).astype(float)
+    codes = sim["treatment"].reshape(num_studies, -1)
+
+    def moments(code):
+        mask = codes == code
+        n = mask.sum(axis=1)
+        mean = np.where(mask, y, 0).sum(axis=1) / n
+        var = np.where(mask, (y - mean[:, None]) ** 2, 0).sum(axis=1) / (n - 1)
+        return n, mean, var
+
+    n1, mean1, var1 = moments(C.TREATMENTS.index(treatment))
+    n0, mean0, var0 = moments(C.TREATMENTS.index(baseline))
+    effect = mean1 - mean0
+    z = effect / np.sqrt(var1 / n1 + var0 / n0)
+    critical = NormalDist().inv_cdf(1 - alpha / 2)
+    return dict(
+        power=float(np.mean(np.abs(z) > critical)),
+        mean_effect=float(effect.mean()),
+        effect_sd=float(effect.std()),
+        num_studies=num_studies,
+    )
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Power of the PWYW design by study size")
+    parser.add_argument("--participants", nargs="+", type=int, default=[10, 20, 30])
+    parser.add_argument("--sessions", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--studies", type=int, default=1000)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    start = time.perf_counter()
+    print(f"{'sessions':>8} {'participants':>12} {'power':>7} {'effect':>8}")
+    for num_sessions in args.sessions:
+        for num_participants in args.participants:
+            result = power(num_sessions, num_participants, num_studies=args.studies, rng=rng)
+            print(
+                f"{num_sessions:>8} {num_participants:>12} "
+                f"{result['power']:>7.3f} {result['mean_effect']:>8.2f}"
+            )
+    print(f"({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+from otree.api import *
+from otree.database import db
+import random
+
+from . import *
+from . import analysis
+
+
+# dropout case: the pair of the first group in DROPOUT_ROUND (one participant
+# of each role group) stops responding, so their round pages are submitted by
+# timeouts from then on. With arrival matching, whose groups are only formed as
+# participants arrive, it is the first participant of each role group of cohort 1.
+DROPOUT_ROUND = 4
+
+
+def drops_out(case, player):
+    if case != "dropout" or player.round_number < DROPOUT_ROUND:
+        return False
+    if arrival_matching(player.session):
+        first_of_role_groups = {}
+        for participant in player.session.get_participants():
+            if cohort(participant) == 1:
+                first_of_role_groups.setdefault(role_group(participant), participant.id)
+        return player.participant_id in first_of_role_groups.values()
+    return player.in_round(DROPOUT_ROUND).group.id_in_subsession == 1
+
+
+def other_player(player):
+    # not partner_of: group.buyer and group.seller cache players on the group
+    # object, and the bots' database session outlives the page requests
+    return next(p for p in player.group.get_players() if p.id != player.id)
+
+
+def buyer_choice(group):
+    """A plausible buyer: usually buys, paying near the suggested price or the cost"""
+    if random.random() < 0.2:
+        return dict(buyer_decision=False)
+    anchor = group.field_maybe_none("suggested_price") or group.production_cost
+    price = min(max(anchor + random.randint(-5, 10), 0), C.BUYER_ENDOWMENT)
+    return dict(buyer_decision=True, price_paid=price)
+
+
+def expected_payoffs(group):
+    """(buyer, seller) potential payoffs, computed independently of set_payoffs"""
+    if group.buyer_decision:
+        return (
+            C.BUYER_ENDOWMENT - group.price_paid + group.product_utility,
+            group.price_paid - group.production_cost,
+        )
+    return C.BUYER_ENDOWMENT, 0
+
+
+def call_live_method(group, case, **kwargs):
+    """Market page: the buyer first sends an invalid, then a real decision"""
+    # calls live_method directly rather than through the method= argument,
+    # which newer oTree versions hand over as an unstarted async generator
+    # the bots' database session outlives the page requests: reload what they
+    # wrote, or committing the live method's changes would overwrite it
+    db.expire_all()
+    if drops_out(case, group.buyer):
+        return
+    Market.live_method(group.buyer, dict(type="decision", buyer_decision=True, price_paid=None))
+    Market.live_method(group.buyer, dict(type="decision", **buyer_choice(group)))
+    Market.live_method(group.seller, dict(type="load"))
+
+
+class PlayerBot(Bot):
+    cases = ["basic", "dropout"]
+
+    def check_payoff(self):
+        if self.group.field_maybe_none("buyer_decision") is None:
+            # live round left by the seller before a stand-in buyer decided
+            return
+        buyer_payoff, seller_payoff = expected_payoffs(self.group)
+        if self.player.role() == C.BUYER_ROLE:
+            expect(self.player.potential_payoff, buyer_payoff)
+        else:
+            expect(self.player.potential_payoff, seller_payoff)
+
+    def play_round(self):
+        if drops_out(self.case, self.player):
+            yield from self.play_round_as_dropout()
+        elif live_round(self.session):
+            yield Market
+            self.check_payoff()
+        else:
+            if self.player.role() == C.BUYER_ROLE:
+                yield SubmissionMustFail(Decision, dict(buyer_decision=True))
+                yield Decision, buyer_choice(self.group)
+                expect(self.group.decision_timed_out, False)
+                expect(self.group.decision_seconds, ">=", 0)
+            else:
+                yield SellerInfo
+            self.check_payoff()
+            yield Results
+
+        if self.round_number == C.NUM_ROUNDS:
+            self.check_design()
+            self.check_reproducible()
+            if self.case == "basic" and not arrival_matching(self.session):
+                self.check_partners()
+                self.check_metrics()
+            if self.case == "basic" and self.participant.id_in_session == 1:
+                self.check_analysis()
+
+    def check_design(self):
+        """Roles and the buyers' treatments follow the declared design fields"""
+        treatments = treatment_order(self.participant)
+        own_cohort = cohort(self.participant)
+        schedule = role_schedule(self.session, own_cohort)
+        for p in self.player.in_all_rounds():
+            buys = schedule[p.round_number - 1] == role_group(self.participant)
+            expect(p.role(), C.BUYER_ROLE if buys else C.SELLER_ROLE)
+            expect(p.group.cohort, own_cohort)
+            if buys:
+                expect(p.group.treatment, treatments[p.round_number - 1])
+
+    def check_reproducible(self):
+        """The design is rebuilt exactly from session.seed"""
+        participants = self.session.get_participants()
+        plan = design.build_cohort_design(
+            C,
+            len(participants),
+            self.session.config.get("cohort_size"),
+            session_rng(self.session, "design"),
+        )
+        idx = self.participant.id_in_session - 1
+        start = idx * C.NUM_ROUNDS
+        treatments = plan["treatment_order"][start:start + C.NUM_ROUNDS]
+        expect([C.TREATMENTS[code] for code in treatments], treatment_order(self.participant))
+        own_cohort = cohort(self.participant)
+        expect(plan["paying_round"][own_cohort - 1], paying_round(self.session, own_cohort))
+
+    def check_partners(self):
+        """Perfect stranger within the cohort: all partners before any repeat, never twice in a row
+        (with 2+ pairs; a cohort of one pair always meets the same partner)"""
+        partners = [other_player(p).participant_id for p in self.player.in_all_rounds()]
+        own_cohort = cohort(self.participant)
+        cohort_size = sum(cohort(p) == own_cohort for p in self.session.get_participants())
+        num_pairs = cohort_size // 2
+        max_meetings = -(-C.NUM_ROUNDS // num_pairs)
+        expect(max(partners.count(partner) for partner in partners), "<=", max_meetings)
+        if num_pairs > 1:
+            expect(all(a != b for a, b in zip(partners, partners[1:])), True)
+
+    def check_metrics(self):
+        """The pages' callbacks were timed, and this participant is counted on a page"""
+        text = metrics.exposition()
+        page, callback = (
+            ("Market", "before_next_page")
+            if live_round(self.session)
+            else ("ResultsWaitPage", "after_all_players_arrive")
+        )
+        expect(f'app="my_game",page="{page}",callback="{callback}",le="+Inf"', "in", text)
+        expect(f'pwyw_participants_on_page{{session="{self.session.code}"', "in", text)
+
+    def check_analysis(self):
+        """Every outcome offered by analysis.py runs on this session's custom export"""
+        rows = list(custom_export(Player.objects_filter(session=self.session)))
+        data = analysis.load(rows)
+        expect(len(analysis.summarize(data)), ">=", 1)
+        for outcome in analysis.OUTCOMES:
+            baseline, compared = analysis.comparison(outcome)
+            effects = analysis.fixed_effects(data, outcome)
+            expect(set(effects), {C.TREATMENTS[code] for code in compared})
+            for row in analysis.bootstrap(data, outcome, num_draws=50, rng=1):
+                expect(row["baseline"], C.TREATMENTS[baseline])
+
+    def play_round_as_dropout(self):
+        if live_round(self.session):
+            yield Submission(Market, timeout_happened=True)
+        else:
+            page = Decision if self.player.role() == C.BUYER_ROLE else SellerInfo
+            yield Submission(page, timeout_happened=True)
+            yield Submission(Results, timeout_happened=True)
+        self.check_payoff()
+        if live_round(self.session) and decision_deadline(self.session):
+            # on the buyer's Market page the deadline passes first: a missed deadline,
+            # not a dropout, so the dropouts need not have been paired with each other
+            expect(self.player.auto_played or self.group.decision_timed_out, True)
+            return
+        expect(self.player.auto_played, True)
+        if self.round_number == C.NUM_ROUNDS:
+            # the two dropouts were rematched (with arrival matching: paired) with each
+            # other long before the last round
+            partner = other_player(self.player)
+            expect(drops_out(self.case, partner), True)
+            expect(partner.role(), "!=", self.player.role())
@@ -0,0 +1,307 @@
+from otree.api import *
+
+import my_game
+
+
+doc = """
+After the market: the questionnaire, then the payment page with the
+paying round drawn in my_game and the participant's round history.
+"""
+
+
+class C(BaseConstants):
+    NAME_IN_URL = "outro"
+    PLAYERS_PER_GROUP = None
+    NUM_ROUNDS = 1
+
+
+class Subsession(BaseSubsession):
+    pass
+
+
+class Group(BaseGroup):
+    pass
+
+
+class Player(BasePlayer):
+    # Questionnaire Part 1
+    q_fair_price = models.IntegerField(
+        label="My price paid for the product was fair toward the seller.",
+        choices=[
+            [1, "1 - Strongly Disagree"],
+            [2, "2"],
+            [3, "3"],
+            [4, "4"],
+            [5, "5"],
+            [6, "6"],
+            [7, "7 - Strongly Agree"],
+        ],
+        widget=widgets.RadioSelectHorizontal,
+    )
+    q_felt_good = models.IntegerField(
+        label="I felt good about the price I paid.",
+        choices=[
+            [1, "1 - Strongly Disagree"],
+            [2, "2"],
+            [3, "3"],
+            [4, "4"],
+            [5, "5"],
+            [6, "6"],
+            [7, "7 - Strongly Agree"],
+        ],
+        widget=widgets.RadioSelectHorizontal,
+    )
+    q_fair_to_seller = models.IntegerField(
+        label="I paid a higher price because I wanted to be fair to the seller.",
+        choices=[
+            [1, "1 - Strongly Disagree"],
+            [2, "2"],
+            [3, "3"],
+            [4, "4"],
+            [5, "5"],
+            [6, "6"],
+            [7, "7 - Strongly Agree"],
+        ],
+        widget=widgets.RadioSelectHorizontal,
+    )
+    q_guilty_low_price = models.IntegerField(
+        label="Paying a low price would have made me feel guilty.",
+        choices=[
+            [1, "1 - Strongly Disagree"],
+            [2, "2"],
+            [3, "3"],
+            [4, "4"],
+            [5, "5"],
+            [6, "6"],
+            [7, "7 - Strongly Agree"],
+        ],
+        widget=widgets.RadioSelectHorizontal,
+    )
+    q_reward_seller = models.IntegerField(
+        label="I paid a higher amount to reward the seller for their generosity.",
+        choices=[
+            [1, "1 - Strongly Disagree"],
+            [2, "2"],
+            [3, "3"],
+            [4, "4"],
+            [5, "5"],
+            [6, "6"],
+            [7, "7 - Strongly Agree"],
+        ],
+        widget=widgets.RadioSelectHorizontal,
+    )
+    q_obligated_fair = models.IntegerField(
+        label="I felt obligated to pay a fair price because the seller trusted me.",
+        choices=[
+            [1, "1 - Strongly Disagree"],
+            [2, "2"],
+            [3, "3"],
+            [4, "4"],
+            [5, "5"],
+            [6, "6"],
+            [7, "7 - Strongly Agree"],
+        ],
+        widget=widgets.RadioSelectHorizontal,
+    )
+    q_suggested_influenced = models.IntegerField(
+        label="The suggested price influenced the amount I decided to pay.",
+        choices=[
+            [1, "1 - Strongly Disagree"],
+            [2, "2"],
+            [3, "3"],
+            [4, "4"],
+            [5, "5"],
+            [6, "6"],
+            [7, "7 - Strongly Agree"],
+        ],
+        widget=widgets.RadioSelectHorizontal,
+    )
+    q_suggested_guide = models.IntegerField(
+        label="I used the suggested price as a guide for what was appropriate to pay.",
+        choices=[
+            [1, "1 - Strongly Disagree"],
+            [2, "2"],
+            [3, "3"],
+            [4, "4"],
+            [5, "5"],
+            [6, "6"],
+            [7, "7 - Strongly Agree"],
+        ],
+        widget=widgets.RadioSelectHorizontal,
+    )
+    q_suggested_quality = models.IntegerField(
+        label="I believe the suggested price reflects the true quality of the product.",
+        choices=[
+            [1, "1 - Strongly Disagree"],
+            [2, "2"],
+            [3, "3"],
+            [4, "4"],
+            [5, "5"],
+            [6, "6"],
+            [7, "7 - Strongly Agree"],
+        ],
+        widget=widgets.RadioSelectHorizontal,
+    )
+
+    # Questionnaire Part 2
+    dem_sex = models.StringField(
+        label="1. What is your sex?",
+        choices=["Male", "Female", "Prefer not to say"],
+        widget=widgets.RadioSelect,
+    )
+    dem_age = models.StringField(
+        label="2. How old are you?",
+        choices=[str(i) for i in range(18, 31)] + ["30+", "Prefer not to say"],
+    )
+    dem_employment = models.StringField(
+        label="3. What is your current employment status? (Select all that apply)",
+        blank=True,
+    )
+    dem_income = models.StringField(
+        label="4. Please indicate your net monthly income (Your total take-home pay after taxes, or the total money available to you including salary, allowances, and support):",
+        choices=[
+            "< 5,000,000 VND",
+            "5,000,000 - 10,000,000 VND",
+            "10,000,000 - 15,000,000 VND",
+            "15,000,000 - 20,000,000 VND",
+            "> 20,000,000 VND",
+            "Prefer not to say",
+        ],
+        widget=widgets.RadioSelect,
+    )
+    dem_familiar = models.StringField(
+        label="5. Are you familiar with the pricing strategy that is implemented in the experiment?",
+        choices=["Yes", "No"],
+        widget=widgets.RadioSelect,
+    )
+    dem_strategy_name = models.StringField(
+        label="(If Yes) What do you usually call this pricing strategy?", blank=True
+    )
+
+
+# PAGES
+class Questionnaire(Page):
+    form_model = "player"
+    form_fields = [
+        "q_fair_price",
+        "q_felt_good",
+        "q_fair_to_seller",
+        "q_guilty_low_price",
+        "q_reward_seller",
+        "q_obligated_fair",
+        "q_suggested_influenced",
+        "q_suggested_guide",
+        "q_suggested_quality",
+        "dem_sex",
+        "dem_age",
+        "dem_employment",
+        "dem_income",
+        "dem_familiar",
+        "dem_strategy_name",
+    ]
+
+    @staticmethod
+    def vars_for_template(player: Player):
+        # Randomize the order of Part 1 questions
+        q_field_names = [
+            "q_fair_price",
+            "q_felt_good",
+            "q_fair_to_seller",
+            "q_guilty_low_price",
+            "q_reward_seller",
+            "q_obligated_fair",
+            "q_suggested_influenced",
+            "q_suggested_guide",
+            "q_suggested_quality",
+        ]
+        rng = my_game.session_rng(player.session, "questionnaire", player.participant.id_in_session)
+        rng.shuffle(q_field_names)
+
+        labels = {
+            "q_fair_price": "My price paid for the product was fair toward the seller.",
+            "q_felt_good": "I felt good about the price I paid.",
+            "q_fair_to_seller": "I paid a higher price because I wanted to be fair to the seller.",
+            "q_guilty_low_price": "Paying a low price would have made me feel guilty.",
+            "q_reward_seller": "I paid a higher amount to reward the seller for their generosity.",
+            "q_obligated_fair": "I felt obligated to pay a fair price because the seller trusted me.",
+            "q_suggested_influenced": "The suggested price influenced the amount I decided to pay.",
+            "q_suggested_guide": "I used the suggested price as a guide for what was appropriate to pay.",
+            "q_suggested_quality": "I believe the suggested price reflects the true quality of the product.",
+        }
+
+        q_fields = []
+        for name in q_field_names:
+            q_fields.append(dict(name=name, label=labels[name]))
+
+        return dict(q_fields=q_fields)
+
+
+class ThankYou(Page):
+    form_model = "player"
+    # form_fields = ["bank_name", "account_number", "account_holder_name"]
+
+    @staticmethod
+    def vars_for_template(player: Player):
+        # Retrieve the common paying round selected in creating_session
+        selected_round_number = my_game.paying_round(
+            player.session, my_game.cohort(player.participant)
+        )
+
+        # History for the table, from the round ledger (one fetch for all rounds)
+        history = my_game.ledger_history(player.participant, selected_round_number)
+
+        # Computed once by set_payoffs in the paying round (show-up fee + payoff, at least 0)
+        payment = my_game.payment(player.participant)
+        payoff_selected_round = payment['round_payoff']
+
+        return dict(
+            participant_id=player.participant.code,
+            selected_round_number=selected_round_number,
+            payoff_selected_round=payoff_selected_round,
+            show_up_fee=my_game.C.SHOW_UP_FEE,
+            show_up_fee_vnd=f"{my_game.C.SHOW_UP_FEE * my_game.C.CONVERSION_RATE:,.0f}",
+            earnings_from_round_vnd=f"{payoff_selected_round * my_game.C.CONVERSION_RATE:,.0f}",
+            total_tokens=payment['tokens'],
+            total_payment_vnd=f"{payment['vnd']:,.0f}",
+            history=history,
+        )
+
+
+# PAYMENT EXPORT
+# One row per participant with the payment stored by my_game (see my_game.payment), for
+# finance: no rounds are read.
+PAYMENT_HEADER = [
+    "session",
+    "participant",
+    "label",
+    "cohort",
+    "paying_round",
+    "round_payoff_tokens",
+    "show_up_fee_tokens",
+    "total_tokens",
+    "total_vnd",
+]
+
+
+def custom_export(players):
+    """Payment file: one row per participant of every session"""
+    yield PAYMENT_HEADER
+    for p in players:
+        participant = p.participant
+        payment = my_game.payment(participant)
+        yield [
+            p.session.code,
+            participant.code,
+            participant.label,
+            my_game.cohort(participant),
+            my_game.paying_round(p.session, my_game.cohort(participant)),
+            payment['round_payoff'],
+            my_game.C.SHOW_UP_FEE,
+            payment['tokens'],
+            payment['vnd'],
+        ]
+
+
+page_sequence = [Questionnaire, ThankYou]
+my_game.metrics.instrument_pages(page_sequence)
+my_game.profiling.instrument_app(__name__)
@@ -0,0 +1,54 @@
+from otree.api import *
+import random
+
+import my_game
+
+from . import *
+
+
+LIKERT_FIELDS = [
+    "q_fair_price",
+    "q_felt_good",
+    "q_fair_to_seller",
+    "q_guilty_low_price",
+    "q_reward_seller",
+    "q_obligated_fair",
+    "q_suggested_influenced",
+    "q_suggested_guide",
+    "q_suggested_quality",
+]
+
+
+class PlayerBot(Bot):
+    def play_round(self):
+        answers = {name: random.randint(1, 7) for name in LIKERT_FIELDS}
+        familiar = random.choice(["Yes", "No"])
+        answers.update(
+            dem_sex=random.choice(["Male", "Female", "Prefer not to say"]),
+            dem_age=random.choice([str(i) for i in range(18, 31)]),
+            dem_employment='["Student"]',
+            dem_income="Prefer not to say",
+            dem_familiar=familiar,
+            dem_strategy_name="Pay what you want" if familiar == "Yes" else "",
+        )
+        yield Questionnaire, answers
+
+        expect(len(self.participant.vars["round_ledger"]), my_game.C.NUM_ROUNDS)
+        self.check_payment()
+        yield Submission(ThankYou, check_html=False)
+
+    def check_payment(self):
+        """The stored payment follows the paying round's payoff, and is what gets exported"""
+        paying_round = my_game.paying_round(self.session, my_game.cohort(self.participant))
+        round_payoff = next(
+            payoff
+            for round_number, _, _, payoff in self.participant.vars["round_ledger"]
+            if round_number == paying_round
+        )
+        tokens = max(my_game.C.SHOW_UP_FEE + round_payoff, 0)
+        expect(my_game.payment(self.participant)["tokens"], tokens)
+
+        header, row = custom_export([self.player])
+        row = dict(zip(header, row))
+        expect(row["round_payoff_tokens"], round_payoff)
+        expect(row["total_vnd"], tokens * my_game.C.CONVERSION_RATE)
@@ -8,7 +8,27 @@ SESSION_CONFIGS = [
         name="decision_making_game",
         display_name="Decision-making in the absence of fixed prices",
         num_demo_participants=2,
-        app_sequence=["my_game"],
+        app_sequence=["intro", "my_game", "outro"],
+        # Show a running table of the participant's past rounds on the Results page
+        show_round_history=False,
+        # Play each round on one live page (Market) instead of Decision/SellerInfo/Results
+        live_round=False,
+        # Seconds of inactivity on a round page before a participant is treated as a
+        # dropout and a stand-in takes over (0: never, e.g. 120 for online sessions)
+        dropout_timeout_seconds=0,
+        # Seconds the buyer has to decide; past them the buyer does not buy and the round
+        # goes on, flagged in group.decision_timed_out (0: no deadline, e.g. 60)
+        decision_timeout_seconds=0,
+        # Split the participants into independent matching pools of (about) this many,
+        # each with its own role schedule and paying round (0: one pool)
+        cohort_size=0,
+        # Pair buyers and sellers each round from whoever is ready (group_by_arrival_time)
+        # instead of in fixed pairs made at session creation; roles and treatments still
+        # follow the design
+        arrival_matching=False,
+        # Seed of all random draws of the session (0: a new random seed); the seed
+        # used is stored in session.seed, so a session can be re-created exactly
+        seed=0,
         doc="""
         Pricing experiment with 6+ players.
         Players are randomly matched each round (no repeats).
@@ -30,12 +50,24 @@ ROOMS = [
 # the session config can be accessed from methods in your apps as self.session.config,
 # e.g. self.session.config['participation_fee']
 
+# The admin's Payments page uses these: keep them equal to my_game's C.CONVERSION_RATE
+# and C.SHOW_UP_FEE * C.CONVERSION_RATE
 SESSION_CONFIG_DEFAULTS = dict(
     real_world_currency_per_point=200.00, participation_fee=20000.00, doc=""
 )
 
-PARTICIPANT_FIELDS = ["initial_role"]
-SESSION_FIELDS = ["treatment_sequence"]
+# Design state written in my_game's creating_session, and the payment written by
+# set_payoffs in the paying round; read them through the accessors in my_game
+# (role_group(), paying_round(), payment(), ...), which do not mark vars as changed
+PARTICIPANT_FIELDS = [
+    "cohort",
+    "role_group",
+    "treatment_order",
+    "is_dropout",
+    "paying_round_payoff",
+    "payment_tokens",
+]
+SESSION_FIELDS = ["seed", "role_schedule", "paying_round"]
 
 # ISO-639 code
 # for example: de, fr, ja, ko, zh-hans